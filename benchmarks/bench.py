@@ -0,0 +1,225 @@
+"""
+Бенчмарки загрузки, отчета и отправки на локальной заглушке Bitrix24/Telegram.
+
+Каждый сценарий запускается в отдельном процессе, чтобы пиковый RSS
+относился только к нему. Пример:
+
+    python benchmarks/bench.py --tasks 1000,100000 --scenarios fetch,fetch_batch
+
+Без ошибок заглушки (--error-rate 0) каждый способ загрузки обязан насчитать
+ровно столько задач, сколько отдала заглушка; иначе бенчмарк завершается с ошибкой.
+"""
+
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+SCENARIOS = (
+    "fetch",
+    "fetch_batch",
+    "fetch_counts",
+    "fetch_async",
+    "render",
+    "telegram",
+)
+# Сценарии загрузки, результаты которых должны совпадать
+FETCH_SCENARIOS = ("fetch", "fetch_batch", "fetch_counts", "fetch_async")
+
+
+def _configure_environment(port):
+    # constants читает переменные окружения при первом обращении, поэтому задаем их заранее
+    os.environ[
+        "TASK_DETAIL_URL"
+    ] = f"http://127.0.0.1:{port}/rest/1/token/tasks.task.list"
+    os.environ["B24REPORT_BOT"] = "token"
+    os.environ["B24REPORT_CHAT_ID"] = "-100"
+    # Кэш пользователей и прочие файлы пишем во временную папку
+    os.chdir(tempfile.mkdtemp(prefix="b24bench-"))
+
+
+def _synthetic_results(tasks, responsibles):
+    """
+    Агрегированные данные для сценариев отчета: число строк растет вместе с задачами.
+    """
+    from src.b24request import groups
+
+    responsibles = max(responsibles, tasks // 100)
+
+    per_group = tasks // len(groups)
+    return {
+        group_name: {
+            f"Сотрудник {i + 1}": per_group // responsibles for i in range(responsibles)
+        }
+        for group_name in groups.values()
+    }
+
+
+def run_scenario(scenario, tasks, args):
+    """
+    Выполняет один сценарий в текущем процессе и возвращает словарь с замерами.
+    """
+    from stub_server import StubConfig, start_stub_server
+
+    config = StubConfig(
+        tasks=tasks,
+        responsibles=args.responsibles,
+        page_size=args.page_size,
+        latency=args.latency,
+        rate_limit=args.rate_limit,
+        error_rate=args.error_rate,
+    )
+    server, backend = start_stub_server(config)
+    _configure_environment(server.server_address[1])
+
+    from src.b24request import (
+        fetch_task_statistics_report,
+        fetch_task_statistics_report_batch,
+        fetch_task_statistics_report_counts,
+        generate_html_report,
+        get_previous_month_date_range,
+        iter_html_report_chunks,
+    )
+    from src.tg_alert_cls import TelegramAlert
+
+    start_date_api, end_date_api = get_previous_month_date_range()
+    started = time.perf_counter()
+
+    if scenario == "fetch":
+        result = fetch_task_statistics_report(start_date_api, end_date_api)
+    elif scenario == "fetch_batch":
+        result = fetch_task_statistics_report_batch(start_date_api, end_date_api)
+    elif scenario == "fetch_counts":
+        result = fetch_task_statistics_report_counts(start_date_api, end_date_api)
+    elif scenario == "fetch_async":
+        from src.b24async import fetch_task_statistics_report_concurrent
+
+        result = fetch_task_statistics_report_concurrent(
+            start_date_api, end_date_api, rate=args.async_rate
+        )
+    elif scenario == "render":
+        results = _synthetic_results(tasks, args.responsibles)
+        started = time.perf_counter()
+        result = generate_html_report(results)
+    elif scenario == "telegram":
+        results = _synthetic_results(tasks, args.responsibles)
+        bot = TelegramAlert(
+            "token", "-100", api_url=f"http://127.0.0.1:{server.server_address[1]}"
+        )
+        started = time.perf_counter()
+        result = bot.send_message(iter_html_report_chunks(results))
+    else:
+        raise ValueError(f"Неизвестный сценарий: {scenario}")
+
+    wall_time = time.perf_counter() - started
+    server.shutdown()
+
+    if isinstance(result, dict):
+        counted = sum(sum(stats.values()) for stats in result.values())
+    else:
+        counted = None
+
+    return {
+        "scenario": scenario,
+        "tasks": tasks,
+        "wall_time": round(wall_time, 4),
+        "counted_tasks": counted,
+        # На Linux ru_maxrss в килобайтах
+        "peak_rss_mb": round(
+            resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1
+        ),
+        **backend.stats.as_dict(),
+    }
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Бенчмарки b24reportcon")
+    parser.add_argument(
+        "--tasks", default="1000,100000,1000000", help="Объемы задач через запятую"
+    )
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS))
+    parser.add_argument("--responsibles", type=int, default=50)
+    parser.add_argument("--page-size", type=int, default=50)
+    parser.add_argument("--latency", type=float, default=0.0, help="Задержка ответа, с")
+    parser.add_argument("--rate-limit", type=int, default=0, help="Запросов в секунду")
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--async-rate", type=float, default=1000.0)
+    parser.add_argument("--output", help="Файл для результатов в формате JSON Lines")
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    if args.worker:
+        scenario, tasks = args.worker.split(":")
+        print(json.dumps(run_scenario(scenario, int(tasks), args), ensure_ascii=False))
+        return
+
+    worker_args = [
+        f"--responsibles={args.responsibles}",
+        f"--page-size={args.page_size}",
+        f"--latency={args.latency}",
+        f"--rate-limit={args.rate_limit}",
+        f"--error-rate={args.error_rate}",
+        f"--async-rate={args.async_rate}",
+    ]
+    output = open(args.output, "a", encoding="utf-8") if args.output else None
+    failures = []
+    for tasks in (int(value) for value in args.tasks.split(",")):
+        counts = {}
+        for scenario in args.scenarios.split(","):
+            completed = subprocess.run(
+                [
+                    sys.executable,
+                    __file__,
+                    *worker_args,
+                    "--worker",
+                    f"{scenario}:{tasks}",
+                ],
+                capture_output=True,
+                text=True,
+            )
+            if completed.returncode != 0:
+                print(
+                    f"{scenario} ({tasks}): ошибка\n{completed.stderr}", file=sys.stderr
+                )
+                failures.append(f"{scenario} ({tasks}): процесс завершился с ошибкой")
+                continue
+            # Последняя строка вывода - результат, остальное - логи приложения
+            record = json.loads(completed.stdout.strip().splitlines()[-1])
+            print(
+                f"{scenario:<12} tasks={tasks:<8} time={record['wall_time']:>8.3f}s "
+                f"requests={record['requests_total']:<6} "
+                f"bytes={record['bytes_in'] + record['bytes_out']:<10} "
+                f"rss={record['peak_rss_mb']}MB"
+            )
+            if output:
+                output.write(json.dumps(record, ensure_ascii=False) + "\n")
+            if scenario in FETCH_SCENARIOS:
+                counts[scenario] = record["counted_tasks"]
+
+        # С ошибками заглушки группы могут законно выпасть из отчета
+        if args.error_rate == 0:
+            for scenario, counted in counts.items():
+                if counted != tasks:
+                    failures.append(f"{scenario} ({tasks}): насчитано {counted} задач")
+    if output:
+        output.close()
+
+    for failure in failures:
+        print(f"ОШИБКА: {failure}", file=sys.stderr)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
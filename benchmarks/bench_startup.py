@@ -0,0 +1,141 @@
+"""
+Бенчмарк холодного старта: время импорта модулей и запуска CLI в отдельном процессе.
+
+Каждый сценарий запускается несколько раз с -X importtime; печатаются медиана
+времени процесса, медиана времени импорта и то, какие тяжелые модули загрузились.
+
+    python benchmarks/bench_startup.py --repeat 10
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Модули, загрузку которых при старте стоит замечать
+HEAVY_MODULES = ("requests", "aiohttp", "dotenv", "sqlite3")
+
+SAMPLE_DATA = {
+    "report_month": "01.2025",
+    "start": "2025-01-01T00:00:00",
+    "end": "2025-01-31T23:59:59",
+    "results": {"ЗАМЕРЫ": {"Сотрудник 1": 10, "Сотрудник 2": 5}},
+    "failed": [],
+}
+
+
+def scenarios(sample_path):
+    """
+    Сценарии: {название: аргументы python}.
+    """
+    return {
+        "import_cli": ["-c", "import src.cli"],
+        "import_report": ["-c", "import report"],
+        "cli_help": ["-m", "src.cli", "--help"],
+        "cli_render": ["-m", "src.cli", "render", "-i", sample_path, "--format", "csv"],
+        # Для сравнения: весь слой загрузки, как его импортировали раньше
+        "import_b24request": ["-c", "import src.b24request"],
+    }
+
+
+def _import_times(stderr):
+    """
+    Разбирает вывод -X importtime.
+    :return: (время импортов после старта интерпретатора в мкс, загруженные модули)
+    """
+    total = 0
+    modules = set()
+    started = False
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or line.count("|") != 2:
+            continue
+        _, cumulative, name = line.split("|")
+        if not cumulative.strip().isdigit():
+            continue  # Заголовок таблицы
+        module = name.strip()
+        modules.add(module)
+        # Вложенные импорты отмечены отступом, их время уже в родительском
+        top_level = not name[1:].startswith(" ")
+        if top_level and started:
+            total += int(cumulative)
+        if top_level and module == "site":
+            # site импортируется последним при старте интерпретатора
+            started = True
+    return total, modules
+
+
+def run_scenario(name, python_args, repeat):
+    wall_times = []
+    import_times = []
+    loaded = set()
+    env = {**os.environ, "PYTHONPATH": ROOT}
+    for _ in range(repeat):
+        started = time.perf_counter()
+        completed = subprocess.run(
+            [sys.executable, "-X", "importtime", *python_args],
+            cwd=ROOT,
+            env=env,
+            capture_output=True,
+            text=True,
+        )
+        wall_times.append(time.perf_counter() - started)
+        if completed.returncode != 0:
+            raise RuntimeError(f"{name}: ошибка\n{completed.stderr}")
+
+        import_time, modules = _import_times(completed.stderr)
+        import_times.append(import_time)
+        loaded.update(module for module in HEAVY_MODULES if module in modules)
+
+    return {
+        "scenario": name,
+        "repeat": repeat,
+        "wall_time_ms": round(statistics.median(wall_times) * 1000, 1),
+        "import_time_ms": round(statistics.median(import_times) / 1000, 1),
+        "heavy_modules": sorted(loaded),
+    }
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Бенчмарк холодного старта b24reportcon"
+    )
+    parser.add_argument("--repeat", type=int, default=5, help="Запусков на сценарий")
+    parser.add_argument("--scenarios", help="Сценарии через запятую (по умолчанию все)")
+    parser.add_argument("--output", help="Файл для результатов в формате JSON Lines")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    with tempfile.NamedTemporaryFile(
+        "w", suffix=".json", encoding="utf-8", delete=False
+    ) as sample:
+        json.dump(SAMPLE_DATA, sample, ensure_ascii=False)
+
+    output = open(args.output, "a", encoding="utf-8") if args.output else None
+    try:
+        all_scenarios = scenarios(sample.name)
+        names = args.scenarios.split(",") if args.scenarios else list(all_scenarios)
+        for name in names:
+            record = run_scenario(name, all_scenarios[name], args.repeat)
+            print(
+                f"{name:<18} wall={record['wall_time_ms']:>7.1f}ms "
+                f"import={record['import_time_ms']:>7.1f}ms "
+                f"heavy={','.join(record['heavy_modules']) or '-'}"
+            )
+            if output:
+                output.write(json.dumps(record, ensure_ascii=False) + "\n")
+    finally:
+        os.remove(sample.name)
+        if output:
+            output.close()
+
+
+if __name__ == "__main__":
+    main()
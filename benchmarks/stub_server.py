@@ -0,0 +1,308 @@
+"""
+Локальная замена Bitrix24 и Telegram Bot API для бенчмарков.
+
+Имитирует tasks.task.list (с постраничной выдачей start/next/total), batch,
+user.get, sonet_group.user.get и методы Telegram sendMessage/sendDocument. Задержка, размер
+страницы, ограничение частоты и доля ошибок настраиваются.
+"""
+
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlsplit
+
+
+class StubConfig:
+    def __init__(
+        self,
+        tasks=1000,
+        group_ids=(138, 128, 82),
+        responsibles=50,
+        page_size=50,
+        latency=0.0,
+        rate_limit=0,
+        error_rate=0.0,
+        seed=0,
+    ):
+        """
+        Настройки заглушки
+        :param tasks: Общее число задач, делится поровну между группами
+        :param group_ids: ID групп
+        :param responsibles: Число разных ответственных
+        :param page_size: Размер страницы списочных методов
+        :param latency: Задержка каждого ответа в секундах
+        :param rate_limit: Допустимое число запросов в секунду (0 - без ограничения)
+        :param error_rate: Доля запросов, на которые отвечаем 500
+        :param seed: Зерно генератора для воспроизводимых ошибок
+        """
+        self.tasks = tasks
+        self.group_ids = list(group_ids)
+        self.responsibles = responsibles
+        self.page_size = page_size
+        self.latency = latency
+        self.rate_limit = rate_limit
+        self.error_rate = error_rate
+        self.random = random.Random(seed)
+
+
+class StubStats:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.requests = {}
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.errors = 0
+        self.rate_limited = 0
+
+    def record(self, name, bytes_in, bytes_out):
+        with self.lock:
+            self.requests[name] = self.requests.get(name, 0) + 1
+            self.bytes_in += bytes_in
+            self.bytes_out += bytes_out
+
+    def as_dict(self):
+        return {
+            "requests": dict(self.requests),
+            "requests_total": sum(self.requests.values()),
+            "bytes_in": self.bytes_in,
+            "bytes_out": self.bytes_out,
+            "errors": self.errors,
+            "rate_limited": self.rate_limited,
+        }
+
+
+def unflatten_query(query):
+    """
+    Разбирает строку запроса в стиле PHP (filter[GROUP_ID]=1&select[0]=ID)
+    во вложенный словарь; словари с числовыми ключами становятся списками.
+    """
+    result = {}
+    for key, value in parse_qsl(query, keep_blank_values=True):
+        path = re.findall(r"[^\[\]]+", key)
+        node = result
+        for part in path[:-1]:
+            node = node.setdefault(part, {})
+        node[path[-1]] = value
+    return _lists_from_dicts(result)
+
+
+def _lists_from_dicts(node):
+    if not isinstance(node, dict):
+        return node
+    node = {key: _lists_from_dicts(value) for key, value in node.items()}
+    if node and all(key.isdigit() for key in node):
+        return [node[key] for key in sorted(node, key=int)]
+    return node
+
+
+class StubBackend:
+    def __init__(self, config):
+        self.config = config
+        self.stats = StubStats()
+        self.window_start = time.monotonic()
+        self.window_count = 0
+        self.lock = threading.Lock()
+
+    def group_size(self, group_id):
+        groups = self.config.group_ids
+        if group_id not in groups:
+            return 0
+        base, extra = divmod(self.config.tasks, len(groups))
+        return base + (1 if groups.index(group_id) < extra else 0)
+
+    def allow_request(self):
+        """
+        Ограничение частоты по окну в одну секунду.
+        """
+        if not self.config.rate_limit:
+            return True
+        with self.lock:
+            now = time.monotonic()
+            if now - self.window_start >= 1:
+                self.window_start = now
+                self.window_count = 0
+            self.window_count += 1
+            return self.window_count <= self.config.rate_limit
+
+    def _task(self, group_id, k, select):
+        group_offset = self.config.group_ids.index(group_id) * 10**7
+        responsible_id = k % self.config.responsibles + 1
+        task = {
+            "id": str(group_offset + k + 1),
+            "responsibleId": str(responsible_id),
+            "title": f"Задача {k + 1} группы {group_id}",
+            "closedDate": f"2025-01-{k % 28 + 1:02d}T{k % 24:02d}:00:00+03:00",
+            "responsible": {
+                "id": str(responsible_id),
+                "name": f"Сотрудник {responsible_id}",
+            },
+        }
+        if not select:
+            return task
+        wanted = {field.lower() for field in select}
+        return {key: value for key, value in task.items() if key.lower() in wanted}
+
+    def tasks_task_list(self, params):
+        filters = params.get("filter", {})
+        group_id = int(filters.get("GROUP_ID", 0))
+        indexes = range(self.group_size(group_id))
+        if "RESPONSIBLE_ID" in filters:
+            responsible_id = int(filters["RESPONSIBLE_ID"])
+            indexes = indexes[responsible_id - 1 :: self.config.responsibles]
+
+        start = int(params.get("start", 0))
+        page = indexes[start : start + self.config.page_size]
+        select = params.get("select")
+        response = {
+            "result": {"tasks": [self._task(group_id, k, select) for k in page]},
+            "total": len(indexes),
+        }
+        if start + self.config.page_size < len(indexes):
+            response["next"] = start + self.config.page_size
+        return response
+
+    def user_get(self, params):
+        user_ids = range(1, self.config.responsibles + 1)
+        if "ID" in params:
+            user_ids = [int(params["ID"])] if int(params["ID"]) in user_ids else []
+        start = int(params.get("start", 0))
+        page = user_ids[start : start + self.config.page_size]
+        response = {
+            "result": [
+                {"ID": str(user_id), "NAME": "Сотрудник", "LAST_NAME": str(user_id)}
+                for user_id in page
+            ],
+            "total": len(user_ids),
+        }
+        if start + self.config.page_size < len(user_ids):
+            response["next"] = start + self.config.page_size
+        return response
+
+    def sonet_group_user_get(self, params):
+        """
+        Участники группы: все ответственные, кроме последнего,
+        чтобы часть задач приходилась на бывших участников.
+        """
+        if int(params.get("ID", 0)) not in self.config.group_ids:
+            return {
+                "error": "ERROR_GROUP_NOT_FOUND",
+                "error_description": "Group not found",
+            }
+        return {
+            "result": [
+                {"USER_ID": str(user_id), "ROLE": "K"}
+                for user_id in range(1, max(self.config.responsibles, 2))
+            ]
+        }
+
+    def call(self, method, params):
+        handler = {
+            "tasks.task.list": self.tasks_task_list,
+            "user.get": self.user_get,
+            "sonet_group.user.get": self.sonet_group_user_get,
+        }.get(method)
+        if handler is None:
+            return {"error": "ERROR_METHOD_NOT_FOUND", "error_description": method}
+        return handler(params)
+
+    def batch(self, params):
+        result = {
+            "result": {},
+            "result_error": {},
+            "result_total": {},
+            "result_next": {},
+        }
+        for key, command in params.get("cmd", {}).items():
+            method, _, query = command.partition("?")
+            data = self.call(method, unflatten_query(query))
+            if "error" in data:
+                result["result_error"][key] = data
+                continue
+            result["result"][key] = data["result"]
+            result["result_total"][key] = data.get("total")
+            if "next" in data:
+                result["result_next"][key] = data["next"]
+        return {"result": result}
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    backend = None  # Подставляется в start_stub_server
+
+    def log_message(self, *args):
+        pass
+
+    def _read_body(self):
+        if self.headers.get("Transfer-Encoding", "").lower() == "chunked":
+            body = bytearray()
+            while True:
+                size = int(self.rfile.readline().strip(), 16)
+                if size == 0:
+                    self.rfile.readline()
+                    return bytes(body)
+                body += self.rfile.read(size)
+                self.rfile.readline()
+        return self.rfile.read(int(self.headers.get("Content-Length", 0)))
+
+    def _reply(self, name, status, payload, bytes_in):
+        body = json.dumps(payload, ensure_ascii=False).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+        self.backend.stats.record(name, bytes_in, len(body))
+
+    def do_POST(self):
+        backend = self.backend
+        body = self._read_body()
+        path = urlsplit(self.path).path
+        name = path.rsplit("/", 1)[-1]
+        if backend.config.latency:
+            time.sleep(backend.config.latency)
+
+        if path.startswith("/bot"):
+            # Telegram Bot API
+            if not backend.allow_request():
+                backend.stats.rate_limited += 1
+                payload = {
+                    "ok": False,
+                    "error_code": 429,
+                    "parameters": {"retry_after": 1},
+                }
+                return self._reply(name, 429, payload, len(body))
+            return self._reply(name, 200, {"ok": True, "result": {}}, len(body))
+
+        if not backend.allow_request():
+            backend.stats.rate_limited += 1
+            payload = {
+                "error": "QUERY_LIMIT_EXCEEDED",
+                "error_description": "Too many requests",
+            }
+            return self._reply(name, 503, payload, len(body))
+        if (
+            backend.config.error_rate
+            and backend.config.random.random() < backend.config.error_rate
+        ):
+            backend.stats.errors += 1
+            return self._reply(name, 500, {"error": "INTERNAL_SERVER_ERROR"}, len(body))
+
+        params = json.loads(body or b"{}")
+        if name == "batch":
+            return self._reply(name, 200, backend.batch(params), len(body))
+        return self._reply(name, 200, backend.call(name, params), len(body))
+
+
+def start_stub_server(config, host="127.0.0.1", port=0):
+    """
+    Запускает заглушку в фоновом потоке.
+    :return: (сервер, backend); адрес - server.server_address
+    """
+    backend = StubBackend(config)
+    handler = type("BoundStubHandler", (StubHandler,), {"backend": backend})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, backend
@@ -1,14 +1,39 @@
 import os
 
-from dotenv import load_dotenv
-
-# Загружаем переменные из файла .env
-load_dotenv()
-
-TASK_DETAIL_URL = os.getenv("TASK_DETAIL_URL")
-B24REPORT_BOT = os.getenv("B24REPORT_BOT")
-B24REPORT_CHAT_ID = os.getenv("B24REPORT_CHAT_ID")
+# Переменные окружения читаются при первом обращении, а не при импорте:
+# .env загружается один раз, когда значение действительно понадобилось
+ENV_SETTINGS = (
+    "TASK_DETAIL_URL",
+    "B24REPORT_BOT",
+    "B24REPORT_CHAT_ID",
+    # Файл метрик: *.prom - textfile для node exporter, иначе JSON Lines
+    "B24REPORT_METRICS_PATH",
+)
 B24REPORT_THREADS = {
     "общая": None,
     "отчеты по выполненным работам b24": 2,
 }
+
+_env_loaded = False
+
+
+def load_env():
+    """
+    Загружает переменные из файла .env (один раз за процесс).
+    """
+    global _env_loaded
+    if not _env_loaded:
+        from dotenv import load_dotenv
+
+        load_dotenv()
+        _env_loaded = True
+
+
+def __getattr__(name):
+    if name not in ENV_SETTINGS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    load_env()
+    value = os.getenv(name)
+    # Запоминаем значение, следующие обращения обходят __getattr__
+    globals()[name] = value
+    return value
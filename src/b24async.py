@@ -0,0 +1,169 @@
+import asyncio
+import random
+
+import aiohttp
+
+import constants
+from src.b24batch import PAGE_SIZE
+from src.b24client import (
+    DEFAULT_BACKOFF,
+    DEFAULT_MAX_RETRIES,
+    DEFAULT_TIMEOUT,
+    TokenBucket,
+)
+from src.b24request import build_task_list_params, groups
+from src.task_table import TaskTable
+from src.user_directory import get_directory
+
+# Bitrix24 допускает около 2 запросов в секунду на один вебхук
+DEFAULT_RATE = 2.0
+DEFAULT_CONCURRENCY = 4
+
+
+class AsyncTokenBucket:
+    def __init__(self, rate=DEFAULT_RATE, capacity=None):
+        """
+        Асинхронная обертка над TokenBucket из b24client: токен ждется
+        через asyncio.sleep, не блокируя цикл событий
+        :param rate: Количество запросов в секунду
+        :param capacity: Размер ведра, то есть допустимый всплеск (по умолчанию rate)
+        """
+        self.bucket = TokenBucket(rate, capacity)
+
+    async def acquire(self):
+        """
+        Ждет, пока в ведре появится токен, и забирает его.
+        """
+        while True:
+            wait = self.bucket.try_acquire()
+            if not wait:
+                return
+            await asyncio.sleep(wait)
+
+
+async def _fetch_page(session, semaphore, bucket, params, start):
+    """
+    Получает одну страницу; ошибки соединения и 5xx повторяются
+    с экспоненциальной паузой, как в B24Client.
+    """
+    for attempt in range(DEFAULT_MAX_RETRIES + 1):
+        try:
+            async with semaphore:
+                await bucket.acquire()
+                async with session.post(
+                    constants.TASK_DETAIL_URL, json={**params, "start": start}
+                ) as response:
+                    if response.status < 500:
+                        response.raise_for_status()
+                        return await response.json()
+                    response.raise_for_status()
+        except (aiohttp.ClientConnectionError, asyncio.TimeoutError):
+            if attempt == DEFAULT_MAX_RETRIES:
+                raise
+        except aiohttp.ClientResponseError as e:
+            if e.status < 500 or attempt == DEFAULT_MAX_RETRIES:
+                raise
+        await asyncio.sleep(random.uniform(0, DEFAULT_BACKOFF * 2**attempt))
+
+
+async def _fetch_group(
+    session, semaphore, bucket, group_id, start_date_api, end_date_api
+):
+    """
+    Получает все задачи группы: первая страница дает total, остальные
+    страницы запрашиваются параллельно.
+    """
+    params = build_task_list_params(
+        group_id, start_date_api, end_date_api, ["responsibleId"]
+    )
+    first = await _fetch_page(session, semaphore, bucket, params, 0)
+    tasks = list(first.get("result", {}).get("tasks", []))
+
+    next_start = first.get("next")
+    if next_start is None:
+        return tasks
+
+    total = int(first.get("total") or 0)
+    pages = await asyncio.gather(
+        *(
+            _fetch_page(session, semaphore, bucket, params, start)
+            for start in range(int(next_start), total, PAGE_SIZE)
+        )
+    )
+    for page in pages:
+        tasks.extend(page.get("result", {}).get("tasks", []))
+    return tasks
+
+
+async def fetch_task_statistics_report_async(
+    start_date_api,
+    end_date_api,
+    concurrency=DEFAULT_CONCURRENCY,
+    rate=DEFAULT_RATE,
+    status=None,
+    group_ids=None,
+):
+    """
+    Асинхронно получает сокращенную статистику завершенных задач групп.
+    Группы и страницы запрашиваются параллельно через один пул соединений.
+    :param concurrency: Максимальное число одновременных запросов
+    :param rate: Ограничение запросов в секунду на вебхук
+    :param status: Словарь статусов групп, как у fetch_task_statistics_report
+    :param group_ids: ID групп для загрузки (по умолчанию все группы из groups)
+    :return: {название группы: {ответственный: количество}}, как у
+        fetch_task_statistics_report
+    """
+    status = {} if status is None else status
+    selected = {group_id: groups[group_id] for group_id in group_ids or groups}
+    semaphore = asyncio.Semaphore(concurrency)
+    bucket = AsyncTokenBucket(rate)
+    connector = aiohttp.TCPConnector(limit=concurrency)
+    connect_timeout, read_timeout = DEFAULT_TIMEOUT
+    timeout = aiohttp.ClientTimeout(connect=connect_timeout, sock_read=read_timeout)
+
+    async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
+        results = await asyncio.gather(
+            *(
+                _fetch_group(
+                    session, semaphore, bucket, group_id, start_date_api, end_date_api
+                )
+                for group_id in selected
+            ),
+            return_exceptions=True,
+        )
+
+    table = TaskTable()
+    for (group_id, group_name), tasks in zip(selected.items(), results):
+        if isinstance(tasks, (aiohttp.ClientError, asyncio.TimeoutError)):
+            print(f"Ошибка при запросе группы {group_name}: {tasks!r}")
+            status[group_id] = repr(tasks)
+            continue
+        if isinstance(tasks, ValueError):
+            print(f"Ошибка обработки JSON для группы {group_name}")
+            status[group_id] = "Некорректный JSON в ответе"
+            continue
+        if isinstance(tasks, BaseException):
+            raise tasks
+        table.extend(group_id, tasks)
+        status[group_id] = None
+
+    get_directory().fill_table(table)
+    return table.to_report(selected)
+
+
+def fetch_task_statistics_report_concurrent(
+    start_date_api,
+    end_date_api,
+    concurrency=DEFAULT_CONCURRENCY,
+    rate=DEFAULT_RATE,
+    status=None,
+    group_ids=None,
+):
+    """
+    Синхронная обертка над fetch_task_statistics_report_async.
+    """
+    return asyncio.run(
+        fetch_task_statistics_report_async(
+            start_date_api, end_date_api, concurrency, rate, status, group_ids
+        )
+    )
@@ -0,0 +1,127 @@
+from urllib.parse import urlencode
+
+from src.b24client import get_client
+
+# Bitrix24 выполняет не более 50 команд в одном вызове batch
+BATCH_LIMIT = 50
+# Размер страницы списочных методов Bitrix24
+PAGE_SIZE = 50
+
+
+def build_query(params, prefix=None):
+    """
+    Кодирует вложенные параметры в строку запроса в стиле PHP (filter[GROUP_ID]=...),
+    как этого ожидают команды внутри batch.
+    """
+    return urlencode(_flatten_params(params, prefix))
+
+
+def _flatten_params(params, prefix=None):
+    items = params.items() if isinstance(params, dict) else enumerate(params)
+    pairs = []
+    for key, value in items:
+        name = f"{prefix}[{key}]" if prefix else str(key)
+        if isinstance(value, (dict, list, tuple)):
+            pairs.extend(_flatten_params(value, name))
+        else:
+            pairs.append((name, value))
+    return pairs
+
+
+def call_batch(commands, metrics=None, client=None):
+    """
+    Выполняет набор команд одним или несколькими вызовами batch.
+    :param commands: Словарь {ключ: "метод?параметры"}
+    :param metrics: Словарь для подсчета вызовов batch (опционально)
+    :param client: B24Client (по умолчанию общий клиент)
+    :return: Словарь с ключами result, result_error, result_total, result_next
+    """
+    client = client or get_client()
+    merged = {"result": {}, "result_error": {}, "result_total": {}, "result_next": {}}
+    keys = list(commands)
+
+    for i in range(0, len(keys), BATCH_LIMIT):
+        chunk = {key: commands[key] for key in keys[i : i + BATCH_LIMIT]}
+        data = client.call("batch", {"halt": 0, "cmd": chunk})
+
+        if metrics is not None:
+            metrics["requests"] = metrics.get("requests", 0) + 1
+
+        batch_result = data.get("result", {})
+        for part in merged:
+            # Пустые разделы Bitrix24 отдает списком, а не словарем
+            merged[part].update(batch_result.get(part) or {})
+
+    return merged
+
+
+def fetch_lists_batched(
+    list_params, method, items_key=None, metrics=None, errors=None, client=None
+):
+    """
+    Получает все страницы нескольких списочных запросов через batch.
+    Первым проходом запрашиваются первые страницы всех запросов, затем по
+    result_total/result_next все оставшиеся страницы упаковываются в batch
+    по 50 команд.
+    :param list_params: Словарь {ключ: параметры метода}
+    :param method: Списочный метод, например "tasks.task.list"
+    :param items_key: Ключ со списком в result (например "tasks"), None - result сам список
+    :param metrics: Словарь для подсчета вызовов batch (опционально)
+    :param errors: Словарь, в который складываются ошибки по ключам (опционально)
+    :param client: B24Client (по умолчанию общий клиент)
+    :return: Словарь {ключ: список элементов}
+    """
+    items = {key: [] for key in list_params}
+    pages = {key: {} for key in list_params}
+
+    commands = {
+        str(key): f"{method}?{build_query(params)}"
+        for key, params in list_params.items()
+    }
+    first = call_batch(commands, metrics, client)
+
+    # Оставшиеся страницы, которые можно запросить одной волной
+    page_commands = {}
+    page_keys = {}
+    for key, params in list_params.items():
+        cmd_key = str(key)
+        if cmd_key in first["result_error"]:
+            if errors is not None:
+                errors[key] = first["result_error"][cmd_key]
+            continue
+
+        pages[key][0] = _extract_items(first["result"].get(cmd_key), items_key)
+        next_start = first["result_next"].get(cmd_key)
+        total = first["result_total"].get(cmd_key) or 0
+        if next_start is None:
+            continue
+
+        for start in range(int(next_start), int(total), PAGE_SIZE):
+            page_key = f"{cmd_key}_{start}"
+            page_commands[
+                page_key
+            ] = f"{method}?{build_query({**params, 'start': start})}"
+            page_keys[page_key] = (key, start)
+
+    if page_commands:
+        rest = call_batch(page_commands, metrics, client)
+        for page_key, (key, start) in page_keys.items():
+            if page_key in rest["result_error"]:
+                if errors is not None:
+                    errors[key] = rest["result_error"][page_key]
+                continue
+            pages[key][start] = _extract_items(rest["result"].get(page_key), items_key)
+
+    for key, key_pages in pages.items():
+        for start in sorted(key_pages):
+            items[key].extend(key_pages[start])
+
+    return items
+
+
+def _extract_items(result, items_key):
+    if not result:
+        return []
+    if items_key is None:
+        return result
+    return result.get(items_key, [])
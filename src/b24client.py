@@ -0,0 +1,255 @@
+import random
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+import constants
+from src.metrics import span
+
+# Таймауты на установку соединения и чтение ответа, в секундах
+DEFAULT_TIMEOUT = (5, 60)
+DEFAULT_MAX_RETRIES = 5
+DEFAULT_BACKOFF = 1.0
+# Ошибки Bitrix24, после которых запрос имеет смысл повторить
+RETRY_ERRORS = {"QUERY_LIMIT_EXCEEDED", "OPERATION_TIME_LIMIT", "INTERNAL_SERVER_ERROR"}
+
+
+class B24Error(requests.exceptions.RequestException):
+    def __init__(self, code, description=""):
+        """
+        Ошибка, которую вернул Bitrix24
+        :param code: Код ошибки (error)
+        :param description: Описание ошибки (error_description)
+        """
+        super().__init__(f"{code}: {description}" if description else code)
+        self.code = code
+        self.description = description
+
+
+class CircuitOpenError(B24Error):
+    def __init__(self, retry_in):
+        super().__init__(
+            "CIRCUIT_OPEN", f"запросы приостановлены еще на {retry_in:.0f} с"
+        )
+
+
+def method_url(method, webhook_url=None):
+    """
+    Возвращает URL метода REST API на основе URL вебхука (по умолчанию TASK_DETAIL_URL).
+    Например, .../rest/1/abc/tasks.task.list -> .../rest/1/abc/batch
+    """
+    webhook_url = webhook_url or constants.TASK_DETAIL_URL
+    base_url = webhook_url.rstrip("/").rsplit("/", 1)[0]
+    return f"{base_url}/{method}"
+
+
+class CircuitBreaker:
+    def __init__(self, failure_threshold=5, reset_timeout=60):
+        """
+        Размыкатель: после failure_threshold неудачных вызовов подряд
+        запросы не отправляются reset_timeout секунд
+        """
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self.lock = threading.Lock()
+
+    def check(self):
+        """
+        Бросает CircuitOpenError, если размыкатель открыт.
+        По истечении reset_timeout пропускает пробный запрос.
+        """
+        with self.lock:
+            if self.opened_at is None:
+                return
+            retry_in = self.opened_at + self.reset_timeout - time.monotonic()
+            if retry_in > 0:
+                raise CircuitOpenError(retry_in)
+            # Полуоткрытое состояние: следующая ошибка снова разомкнет цепь
+            self.opened_at = None
+            self.failures = self.failure_threshold - 1
+
+    def retry_in(self):
+        """
+        Сколько секунд осталось до пробного запроса (0, если цепь замкнута).
+        """
+        with self.lock:
+            if self.opened_at is None:
+                return 0
+            return max(0, self.opened_at + self.reset_timeout - time.monotonic())
+
+    def record_success(self):
+        with self.lock:
+            self.failures = 0
+            self.opened_at = None
+
+    def record_failure(self):
+        with self.lock:
+            self.failures += 1
+            if self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+
+
+class TokenBucket:
+    def __init__(self, rate, capacity=None):
+        """
+        Потокобезопасное "ведро токенов". Ожидание вынесено из try_acquire,
+        поэтому то же ведро годится и для асинхронного кода (см. b24async)
+        :param rate: Количество запросов в секунду
+        :param capacity: Размер ведра, то есть допустимый всплеск (по умолчанию rate)
+        """
+        self.rate = rate
+        self.capacity = capacity or rate
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def try_acquire(self):
+        """
+        Забирает токен, если он есть.
+        :return: 0, если токен забран, иначе сколько секунд ждать следующего
+        """
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(
+                self.capacity, self.tokens + (now - self.updated) * self.rate
+            )
+            self.updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return 0
+            return (1 - self.tokens) / self.rate
+
+    def acquire(self):
+        """
+        Ждет, пока в ведре появится токен, и забирает его.
+        """
+        while True:
+            wait = self.try_acquire()
+            if not wait:
+                return
+            time.sleep(wait)
+
+
+class B24Client:
+    def __init__(
+        self,
+        webhook_url=None,
+        timeout=DEFAULT_TIMEOUT,
+        max_retries=DEFAULT_MAX_RETRIES,
+        backoff=DEFAULT_BACKOFF,
+        pool_size=10,
+        rate=None,
+        burst=None,
+    ):
+        """
+        HTTP-клиент Bitrix24 с пулом соединений, таймаутами, повторами и размыкателем
+        :param webhook_url: URL вебхука (любого метода, например tasks.task.list),
+            по умолчанию TASK_DETAIL_URL
+        :param timeout: Таймаут (соединение, чтение) в секундах
+        :param max_retries: Максимальное число повторов одного запроса
+        :param backoff: Базовая пауза экспоненциальных повторов в секундах
+        :param pool_size: Размер пула keep-alive соединений
+        :param rate: Допустимое число запросов в секунду (None - без ограничения)
+        :param burst: Допустимый всплеск запросов при rate (по умолчанию rate)
+        """
+        self.webhook_url = webhook_url or constants.TASK_DETAIL_URL
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.breaker = CircuitBreaker()
+        self.bucket = TokenBucket(rate, burst) if rate else None
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def _sleep_before_retry(self, attempt):
+        # Экспоненциальная пауза с полным джиттером
+        time.sleep(random.uniform(0, self.backoff * 2**attempt))
+
+    def call(self, method, params=None):
+        """
+        Вызывает метод REST API и возвращает разобранный JSON-ответ.
+        :raises B24Error: Ошибка Bitrix24 или исчерпаны повторы
+        :raises requests.exceptions.RequestException: Сетевая ошибка после всех повторов
+        """
+        url = method_url(method, self.webhook_url)
+        # Ошибка последней попытки: ее и отдаем, если цепь разомкнулась во время повторов
+        last_error = None
+        with span("b24_request", method=method, bytes=0, retries=0) as attrs:
+            for attempt in range(self.max_retries + 1):
+                attrs["retries"] = attempt
+                try:
+                    self.breaker.check()
+                except CircuitOpenError:
+                    if last_error is not None:
+                        raise last_error
+                    raise
+                if self.bucket:
+                    self.bucket.acquire()
+                last_attempt = attempt == self.max_retries
+                try:
+                    response = self.session.post(
+                        url, json=params or {}, timeout=self.timeout
+                    )
+                    attrs["bytes"] += len(response.content)
+                    with span("json_decode", method=method):
+                        data = response.json()
+                except (
+                    requests.exceptions.ConnectionError,
+                    requests.exceptions.Timeout,
+                ) as e:
+                    # Размыкатель считает неудачные вызовы, а не отдельные попытки
+                    if last_attempt:
+                        self.breaker.record_failure()
+                        raise
+                    last_error = e
+                    print(f"Повтор {method} после ошибки соединения: {e}")
+                    self._sleep_before_retry(attempt)
+                    continue
+                except ValueError:
+                    # Не JSON: обычно страница ошибки прокси при 5xx
+                    if response.status_code >= 500 and not last_attempt:
+                        last_error = requests.exceptions.HTTPError(
+                            f"HTTP {response.status_code}", response=response
+                        )
+                        self._sleep_before_retry(attempt)
+                        continue
+                    self.breaker.record_failure()
+                    response.raise_for_status()
+                    raise
+
+                error = data.get("error") if isinstance(data, dict) else None
+                if error is None and response.ok:
+                    self.breaker.record_success()
+                    return data
+
+                error = error or f"HTTP_{response.status_code}"
+                description = (
+                    data.get("error_description", "") if isinstance(data, dict) else ""
+                )
+                if error in RETRY_ERRORS or response.status_code >= 500:
+                    if not last_attempt:
+                        last_error = B24Error(error, description)
+                        print(f"Повтор {method} после ошибки {error}")
+                        self._sleep_before_retry(attempt)
+                        continue
+                    self.breaker.record_failure()
+                raise B24Error(error, description)
+
+
+_default_client = None
+
+
+def get_client():
+    """
+    Возвращает общий для процесса клиент с вебхуком из TASK_DETAIL_URL.
+    """
+    global _default_client
+    if _default_client is None:
+        _default_client = B24Client()
+    return _default_client
@@ -1,8 +1,16 @@
+import time
+from contextlib import contextmanager
 from datetime import datetime, timedelta
 
 import requests
 
-from constants import TASK_DETAIL_URL
+from src.b24batch import build_query, call_batch, fetch_lists_batched
+from src.b24client import get_client
+from src.metrics import span
+from src.render import iter_report_lines, render_report
+from src.task_table import TaskTable, disambiguate_names
+from src.tg_alert_cls import MESSAGE_LIMIT, iter_html_chunks
+from src.user_directory import get_directory
 
 # Группы с их ID
 groups = {
@@ -11,6 +19,9 @@ groups = {
     82: "Заявки на нестандарт",
 }
 
+# Строка отчета для задач ответственных, которые больше не состоят в группе
+OTHERS_NAME = "Прочие (не в группе)"
+
 
 def get_previous_month_date_range():
     """
@@ -29,99 +40,374 @@ def get_previous_month_date_range():
     return start_date_api, end_date_api
 
 
-def fetch_task_statistics_report(start_date_api, end_date_api):
+def build_task_list_params(group_id, start_date_api, end_date_api, select):
     """
-    Получает сокращенную статистику завершенных задач для каждой группы за указанный период.
+    Формирует параметры tasks.task.list для завершенных задач группы за период.
+    """
+    return {
+        "order": {"ID": "ASC"},  # Сортировка по ID
+        "filter": {
+            "GROUP_ID": group_id,  # Фильтр по группе
+            ">=CLOSED_DATE": start_date_api,  # Завершенные задачи после start_date
+            "<=CLOSED_DATE": end_date_api,  # Завершенные задачи до end_date
+            "STATUS": "5",  # Только завершенные задачи
+        },
+        "select": select,  # Берем только нужные данные
+    }
+
+
+def iter_group_tasks(params, metrics=None, client=None):
+    """
+    Постранично получает задачи tasks.task.list и отдает их по одной.
+    Следует курсору start/next, пока задачи группы не закончатся.
+    :param params: Параметры запроса (order, filter, select)
+    :param metrics: Словарь для метрик постраничной загрузки (опционально):
+        pages - число страниц, tasks - число задач, total - total из ответа,
+        page_times - время получения каждой страницы в секундах
+    :param client: B24Client (по умолчанию общий клиент)
     """
-    report_data = {group_name: {} for group_name in groups.values()}
+    client = client or get_client()
+    if metrics is not None:
+        metrics.setdefault("pages", 0)
+        metrics.setdefault("tasks", 0)
+        metrics.setdefault("total", None)
+        metrics.setdefault("page_times", [])
+
+    start = 0
+    while True:
+        page_started = time.perf_counter()
+        with span("b24_page") as attrs:
+            data = client.call("tasks.task.list", {**params, "start": start})
+            tasks = data.get("result", {}).get("tasks", [])
+            attrs["tasks"] = len(tasks)
+
+        if metrics is not None:
+            metrics["pages"] += 1
+            metrics["tasks"] += len(tasks)
+            metrics["total"] = data.get("total", metrics["total"])
+            metrics["page_times"].append(time.perf_counter() - page_started)
+
+        yield from tasks
+
+        # Bitrix24 не возвращает next на последней странице
+        next_start = data.get("next")
+        if not tasks or next_start is None:
+            break
+        start = next_start
+
+
+@contextmanager
+def group_fetch_status(status, group_id, group_name):
+    """
+    Записывает в status итог загрузки группы: None при успехе или текст ошибки.
+    Ошибки запроса и разбора JSON не выходят за пределы блока, чтобы сбой
+    одной группы не прерывал загрузку остальных.
 
-    for group_id, group_name in groups.items():
-        params = {
-            "order": {"ID": "ASC"},  # Сортировка по ID
-            "filter": {
-                "GROUP_ID": group_id,  # Фильтр по группе
-                ">=CLOSED_DATE": start_date_api,  # Завершенные задачи после start_date
-                "<=CLOSED_DATE": end_date_api,  # Завершенные задачи до end_date
-                "STATUS": "5",  # Только завершенные задачи
-            },
-            "select": ["responsibleId", "responsible"],  # Берем только нужные данные
-        }
-
-        try:
-            response = requests.post(TASK_DETAIL_URL, json=params)
-            response.raise_for_status()
-            data = response.json()
-        except requests.exceptions.RequestException as e:
-            print(f"Ошибка при запросе группы {group_name}: {e}")
+        with group_fetch_status(status, group_id, group_name):
+            table.extend(group_id, iter_group_tasks(params))
+    """
+    try:
+        yield
+    except requests.exceptions.RequestException as e:
+        print(f"Ошибка при запросе группы {group_name}: {e}")
+        status[group_id] = str(e)
+    except ValueError:
+        print(f"Ошибка обработки JSON для группы {group_name}")
+        status[group_id] = "Некорректный JSON в ответе"
+    else:
+        status[group_id] = None
+
+
+def fetch_groups_table(
+    start_date_api,
+    end_date_api,
+    select,
+    metrics=None,
+    group_ids=None,
+    status=None,
+    group_map=None,
+    client=None,
+):
+    """
+    Постранично загружает завершенные задачи групп в TaskTable.
+    :param select: Поля tasks.task.list
+    :param metrics: Словарь, в который по названию группы складываются метрики
+        постраничной загрузки (опционально)
+    :param group_ids: ID групп для загрузки (по умолчанию все группы из group_map)
+    :param status: Словарь, в который по ID группы записывается None при успехе
+        или текст ошибки (опционально)
+    :param group_map: Словарь {ID группы: название} вместо groups (опционально)
+    :param client: B24Client портала (по умолчанию общий клиент)
+    :return: TaskTable с задачами групп, загруженных без ошибок
+    """
+    group_map = group_map or groups
+    status = {} if status is None else status
+    table = TaskTable()
+
+    for group_id in group_ids or group_map:
+        group_name = group_map[group_id]
+        params = build_task_list_params(group_id, start_date_api, end_date_api, select)
+        group_metrics = None
+        if metrics is not None:
+            group_metrics = metrics.setdefault(group_name, {})
+
+        # Задачи группы копятся отдельно, чтобы при ошибке не попасть в отчет частично
+        group_table = TaskTable()
+        with group_fetch_status(status, group_id, group_name):
+            group_table.extend(
+                group_id, iter_group_tasks(params, group_metrics, client)
+            )
+        if status[group_id] is None:
+            table.merge(group_table)
+    return table
+
+
+def fetch_task_statistics_report(
+    start_date_api,
+    end_date_api,
+    metrics=None,
+    group_ids=None,
+    status=None,
+    group_map=None,
+    client=None,
+    directory=None,
+):
+    """
+    Получает сокращенную статистику завершенных задач для каждой группы за указанный период.
+    :param metrics: Словарь, в который по названию группы складываются метрики
+        постраничной загрузки (опционально)
+    :param group_ids: ID групп для загрузки (по умолчанию все группы из groups)
+    :param status: Словарь, в который по ID группы записывается None при успехе
+        или текст ошибки; данные группы с ошибкой в отчет не попадают (опционально)
+    :param group_map: Словарь {ID группы: название} вместо groups (опционально)
+    :param client: B24Client портала (по умолчанию общий клиент)
+    :param directory: UserDirectory портала (по умолчанию общий справочник)
+    """
+    group_map = group_map or groups
+    directory = directory or get_directory()
+    selected = {group_id: group_map[group_id] for group_id in group_ids or group_map}
+    table = fetch_groups_table(
+        start_date_api,
+        end_date_api,
+        ["responsibleId"],
+        metrics,
+        list(selected),
+        status,
+        group_map,
+        client,
+    )
+
+    # Имена берем из справочника, а считаем по responsibleId,
+    # чтобы не склеивать однофамильцев
+    directory.fill_table(table)
+    return table.to_report(selected)
+
+
+def fetch_task_statistics_report_batch(
+    start_date_api,
+    end_date_api,
+    metrics=None,
+    group_ids=None,
+    status=None,
+    group_map=None,
+    client=None,
+    directory=None,
+):
+    """
+    То же, что fetch_task_statistics_report, но первые страницы всех групп и
+    все оставшиеся страницы запрашиваются пачками через batch.
+    :param metrics: Словарь для подсчета вызовов batch (опционально)
+    :param group_ids: ID групп для загрузки (по умолчанию все группы из groups)
+    :param status: Словарь статусов групп, как у fetch_task_statistics_report
+    :param group_map: Словарь {ID группы: название} вместо groups (опционально)
+    :param client: B24Client портала (по умолчанию общий клиент)
+    :param directory: UserDirectory портала (по умолчанию общий справочник)
+    """
+    group_map = group_map or groups
+    directory = directory or get_directory()
+    selected = {group_id: group_map[group_id] for group_id in group_ids or group_map}
+    status = {} if status is None else status
+    list_params = {
+        group_id: build_task_list_params(
+            group_id, start_date_api, end_date_api, ["responsibleId"]
+        )
+        for group_id in selected
+    }
+    errors = {}
+    try:
+        tasks_by_group = fetch_lists_batched(
+            list_params,
+            "tasks.task.list",
+            "tasks",
+            metrics=metrics,
+            errors=errors,
+            client=client,
+        )
+    except requests.exceptions.RequestException as e:
+        print(f"Ошибка при запросе batch: {e}")
+        status.update({group_id: str(e) for group_id in selected})
+        return {group_name: {} for group_name in selected.values()}
+    except ValueError:
+        print("Ошибка обработки JSON ответа batch")
+        status.update({group_id: "Некорректный JSON в ответе" for group_id in selected})
+        return {group_name: {} for group_name in selected.values()}
+
+    table = TaskTable()
+    for group_id, group_name in selected.items():
+        if group_id in errors:
+            print(f"Ошибка при запросе группы {group_name}: {errors[group_id]}")
+            status[group_id] = str(errors[group_id])
             continue
-        except ValueError:
-            print(f"Ошибка обработки JSON для группы {group_name}")
+        table.extend(group_id, tasks_by_group[group_id])
+        status[group_id] = None
+
+    directory.fill_table(table)
+    return table.to_report(selected)
+
+
+def fetch_task_statistics_report_counts(
+    start_date_api,
+    end_date_api,
+    metrics=None,
+    group_ids=None,
+    status=None,
+    group_map=None,
+    client=None,
+    directory=None,
+):
+    """
+    То же, что fetch_task_statistics_report, но задачи не скачиваются: для каждого
+    участника группы Bitrix24 возвращает только total по фильтру с RESPONSIBLE_ID.
+    Число запросов зависит от числа участников, а не задач.
+    Задачи ответственных, которые уже не состоят в группе, попадают в строку OTHERS_NAME
+    как разница между total всей группы и суммой по участникам.
+    :param metrics: Словарь для подсчета вызовов batch (опционально)
+    :param group_ids: ID групп для загрузки (по умолчанию все группы из groups)
+    :param status: Словарь статусов групп, как у fetch_task_statistics_report
+    :param group_map: Словарь {ID группы: название} вместо groups (опционально)
+    :param client: B24Client портала (по умолчанию общий клиент)
+    :param directory: UserDirectory портала (по умолчанию общий справочник)
+    """
+    group_map = group_map or groups
+    directory = directory or get_directory()
+    selected = {group_id: group_map[group_id] for group_id in group_ids or group_map}
+    status = {} if status is None else status
+    empty_report = {group_name: {} for group_name in selected.values()}
+
+    try:
+        members = call_batch(
+            {
+                f"m{group_id}": f"sonet_group.user.get?{build_query({'ID': group_id})}"
+                for group_id in selected
+            },
+            metrics,
+            client,
+        )
+        commands = {}
+        member_ids = {}
+        for group_id in selected:
+            if f"m{group_id}" in members["result_error"]:
+                continue
+            group_members = members["result"].get(f"m{group_id}") or []
+            member_ids[group_id] = sorted(
+                {int(member["USER_ID"]) for member in group_members}
+            )
+            params = build_task_list_params(
+                group_id, start_date_api, end_date_api, ["ID"]
+            )
+            commands[f"g{group_id}"] = f"tasks.task.list?{build_query(params)}"
+            for user_id in member_ids[group_id]:
+                params["filter"]["RESPONSIBLE_ID"] = user_id
+                commands[
+                    f"g{group_id}_u{user_id}"
+                ] = f"tasks.task.list?{build_query(params)}"
+        counts = call_batch(commands, metrics, client)
+    except requests.exceptions.RequestException as e:
+        print(f"Ошибка при запросе batch: {e}")
+        status.update({group_id: str(e) for group_id in selected})
+        return empty_report
+    except ValueError:
+        print("Ошибка обработки JSON ответа batch")
+        status.update({group_id: "Некорректный JSON в ответе" for group_id in selected})
+        return empty_report
+
+    errors = {**members["result_error"], **counts["result_error"]}
+    group_counts = {}
+    for group_id, group_name in selected.items():
+        keys = [f"m{group_id}"]
+        if group_id in member_ids:
+            keys = [f"g{group_id}"]
+            keys.extend(f"g{group_id}_u{user_id}" for user_id in member_ids[group_id])
+        error = next((errors[key] for key in keys if key in errors), None)
+        if error:
+            # Группа без полного набора счетчиков в отчет не попадает
+            print(f"Ошибка при запросе группы {group_name}: {error}")
+            status[group_id] = str(error)
             continue
 
-        tasks = data.get("result", {}).get("tasks", [])
-        if tasks:
-            for task in tasks:
-                responsible = task.get("responsible", {})
-                responsible_name = responsible.get("name", "Неизвестный")
-
-                # Инициализация данных для ответственного
-                if responsible_name not in report_data[group_name]:
-                    report_data[group_name][responsible_name] = 0
-
-                # Увеличиваем счетчик завершенных задач
-                report_data[group_name][responsible_name] += 1
-
+        user_counts = {}
+        for user_id in member_ids[group_id]:
+            count = int(counts["result_total"].get(f"g{group_id}_u{user_id}") or 0)
+            if count:
+                user_counts[user_id] = count
+        group_counts[group_id] = (
+            user_counts,
+            int(counts["result_total"].get(f"g{group_id}") or 0)
+            - sum(user_counts.values()),
+        )
+        status[group_id] = None
+
+    user_ids = {
+        user_id for user_counts, _ in group_counts.values() for user_id in user_counts
+    }
+    try:
+        names = directory.resolve(user_ids)
+    except requests.exceptions.RequestException as e:
+        print(f"Ошибка при запросе пользователей: {e}")
+        names = {}
+    except ValueError:
+        print("Ошибка обработки JSON ответа user.get")
+        names = {}
+    names = disambiguate_names(
+        {user_id: names.get(user_id, "Неизвестный") for user_id in user_ids}
+    )
+
+    report_data = dict(empty_report)
+    for group_id, (user_counts, others) in group_counts.items():
+        group_report = {names[user_id]: count for user_id, count in user_counts.items()}
+        if others > 0:
+            group_report[OTHERS_NAME] = others
+        report_data[selected[group_id]] = group_report
     return report_data
 
 
-def generate_statistics_report(results):
+def generate_statistics_report(results, report_month=None):
     """
     Формирует строку с статистикой завершенных задач в читаемом формате.
     """
-    from datetime import datetime
+    return render_report(results, "text", report_month)
 
-    report_month = (datetime.now().replace(day=1) - timedelta(days=1)).strftime("%m.%Y")
-    report_str = f"Отчет за {report_month}\n"
 
-    for group_name, responsible_stats in results.items():
-        report_str += f"\nГруппа: {group_name}\n"
-        if not responsible_stats:
-            report_str += "  Нет завершенных задач за указанный период.\n"
-            continue
-        for responsible_name, count in responsible_stats.items():
-            report_str += f"  Ответственный: {responsible_name}\n"
-            report_str += f"    Завершенные задачи: {count}\n"
-    return report_str
+def iter_html_report_lines(results, report_month=None):
+    """
+    Построчно формирует отчет в HTML-формате для Telegram с ровным форматированием.
+    """
+    return iter_report_lines(results, "html", report_month)
 
 
-def generate_html_report(results):
+def generate_html_report(results, report_month=None):
     """
     Формирует отчет в HTML-формате для Telegram с ровным форматированием.
     """
-    from datetime import datetime
+    return render_report(results, "html", report_month)
 
-    report_month = (datetime.now().replace(day=1) - timedelta(days=1)).strftime("%m.%Y")
-    report_str = f"<b>Отчет за {report_month}</b>\n\n"
 
-    for group_name, responsible_stats in results.items():
-        report_str += f"🟢 <b>{group_name}</b>\n"
-        if not responsible_stats:
-            report_str += "  Нет завершенных задач за указанный период.\n\n"
-            continue
-
-        report_str += "<pre>\n"
-        report_str += f"{'И.Ф':<22} | {'Закрыто'}\n"
-        report_str += f"{'-' * 22}-|{'-' * 7}\n"
-
-        # 🔹 Сортируем список по убыванию количества закрытых задач
-        sorted_responsibles = sorted(responsible_stats.items(), key=lambda x: x[1], reverse=True)
-
-        for responsible_name, count in sorted_responsibles:
-            report_str += f"{responsible_name:<22} | {count}\n"
-
-        report_str += "</pre>\n"  # Закрываем <pre>
-
-    return report_str
+def iter_html_report_chunks(results, limit=MESSAGE_LIMIT, report_month=None):
+    """
+    Формирует HTML-отчет частями не длиннее limit символов.
+    Блок <pre> при разрыве закрывается и открывается заново в следующей части.
+    """
+    return iter_html_chunks(iter_html_report_lines(results, report_month), limit)
 
 
 def main():
@@ -0,0 +1,465 @@
+"""
+Командная строка отчетов Bitrix24.
+
+    python -m src.cli fetch --mode batch -o report.json   # данные отчета в JSON
+    python -m src.cli render -i report.json --format csv  # отчет из сохраненных данных
+    python -m src.cli send                                # загрузка и отправка в Telegram
+    python -m src.cli dry-run --mode counts               # то же, но вывод вместо отправки
+    python -m src.cli export --since 2025-01-01 --compression gzip -o tasks.csv.gz
+
+Сеть (requests, aiohttp) и настройки из .env загружаются только теми командами,
+которым они нужны: модуль можно импортировать из обработчика бота или
+serverless-функции без лишней задержки холодного старта.
+"""
+
+import argparse
+import json
+import sys
+
+DEFAULT_THREAD = "отчеты по выполненным работам b24"
+PERIODS = ("previous_month", "current_month", "previous_quarter", "year_to_date")
+# cache - локальное хранилище с дозагрузкой, остальные - напрямую из Bitrix24
+FETCH_MODES = ("cache", "pages", "batch", "counts", "async")
+PORTAL_FETCH_MODES = ("pages", "batch", "counts")
+REPORT_FORMATS = ("html", "text", "csv", "json")
+
+
+def _fetch_groups(start_date_api, end_date_api, mode, group_ids):
+    """
+    Загружает группы одного портала.
+    :return: (результаты, {ID группы: None или текст ошибки})
+    """
+    from src.metrics import span
+
+    status = {}
+    if mode == "cache":
+        from src.task_cache import TaskCache, sync_with_retries
+
+        # Дозагружаем только новые задачи и считаем отчет по локальному хранилищу
+        cache = TaskCache()
+        try:
+            with span("sync"):
+                status = sync_with_retries(cache, start_date_api, group_ids=group_ids)
+            with span("aggregate"):
+                results = cache.fetch_task_statistics_report(
+                    start_date_api, end_date_api, group_ids=group_ids
+                )
+        finally:
+            cache.close()
+        return results, status
+
+    if mode == "async":
+        from src.b24async import fetch_task_statistics_report_concurrent
+
+        results = fetch_task_statistics_report_concurrent(
+            start_date_api, end_date_api, status=status, group_ids=group_ids
+        )
+        return results, status
+
+    from src.portals import FETCH_MODES as fetch_functions
+
+    with span("fetch"):
+        results = fetch_functions[mode](
+            start_date_api, end_date_api, group_ids=group_ids, status=status
+        )
+    return results, status
+
+
+def fetch_report(
+    period="previous_month", mode="cache", group_ids=None, portals_path=None
+):
+    """
+    Загружает данные отчета за период.
+    :param period: Период из PERIODS
+    :param mode: Способ загрузки из FETCH_MODES
+    :param group_ids: ID групп (по умолчанию все группы)
+    :param portals_path: JSON-файл порталов для сводного отчета (опционально)
+    :return: {"report_month", "start", "end", "results", "failed"}, где failed -
+        названия групп, данные которых могут быть неполными
+    """
+    from datetime import datetime
+
+    from src.metrics import span
+    from src.periods import period_range
+
+    with span("date_range", period=period):
+        start_date_api, end_date_api, report_month = period_range(
+            period, datetime.now()
+        )
+
+    if portals_path:
+        from src.portals import fetch_portals_report, load_portals
+
+        portals = load_portals(portals_path)
+        status = {}
+        results = fetch_portals_report(
+            portals, start_date_api, end_date_api, mode, status
+        )
+        failed = [
+            portal.group_label(portal.group_map[group_id])
+            for portal in portals
+            for group_id, error in status[portal.name].items()
+            if error
+        ]
+    else:
+        from src.b24request import groups
+
+        unknown = [group_id for group_id in group_ids or () if group_id not in groups]
+        if unknown:
+            raise ValueError(f"Неизвестные группы: {unknown}")
+
+        results, status = _fetch_groups(start_date_api, end_date_api, mode, group_ids)
+        if group_ids:
+            selected = [groups[group_id] for group_id in group_ids]
+            results = {
+                group_name: results.get(group_name, {}) for group_name in selected
+            }
+        failed = [
+            groups[group_id]
+            for group_id, error in status.items()
+            if error and (not group_ids or group_id in group_ids)
+        ]
+
+    return {
+        "report_month": report_month,
+        "start": start_date_api,
+        "end": end_date_api,
+        "results": results,
+        "failed": failed,
+    }
+
+
+def iter_outgoing(data, fmt="html"):
+    """
+    Отдает то, что уйдет в Telegram:
+    ("message", часть сообщения) или ("document", имя файла, функция, создающая поток строк).
+    """
+    import html
+
+    from src.render import iter_report_lines
+    from src.tg_alert_cls import iter_html_chunks
+
+    results = data["results"]
+    report_month = data["report_month"]
+    if fmt == "html":
+        # Отчет уходит частями в пределах лимита длины сообщения Telegram
+        for chunk in iter_html_chunks(iter_report_lines(results, "html", report_month)):
+            yield "message", chunk
+    elif fmt == "text":
+        text = html.escape("".join(iter_report_lines(results, "text", report_month)))
+        for chunk in iter_html_chunks(text.splitlines(keepends=True)):
+            yield "message", chunk
+    else:
+        yield (
+            "document",
+            f"report-{report_month}.{fmt}",
+            lambda: iter_report_lines(results, fmt, report_month),
+        )
+
+    if data["failed"]:
+        failed_names = html.escape(", ".join(data["failed"]))
+        yield "message", f"⚠️ Данные групп могут быть неполными: {failed_names}"
+
+
+def send_report(data, fmt="html", thread_name=DEFAULT_THREAD):
+    """
+    Отправляет отчет в Telegram.
+    :return: True, если отправлено все
+    """
+    import constants
+    from src.tg_alert_cls import TelegramAlert
+
+    alert = TelegramAlert(
+        constants.B24REPORT_BOT,
+        constants.B24REPORT_CHAT_ID,
+        constants.B24REPORT_THREADS,
+    )
+    sent = True
+    for kind, *item in iter_outgoing(data, fmt):
+        if kind == "message":
+            # Часть уже нарезана, повторно не делим
+            sent = alert.send_message(item, thread_name) and sent
+        else:
+            filename, lines = item
+            caption = f"Отчет за {data['report_month']}"
+            sent = (
+                alert.send_file(
+                    lines, thread_name=thread_name, caption=caption, filename=filename
+                )
+                and sent
+            )
+    return sent
+
+
+def print_outgoing(data, fmt="html", output=sys.stdout):
+    """
+    Выводит то, что send_report отправил бы в Telegram.
+    """
+    for number, (kind, *item) in enumerate(iter_outgoing(data, fmt), 1):
+        if kind == "message":
+            output.write(f"--- Сообщение {number} ({len(item[0])} символов) ---\n")
+            output.write(item[0])
+        else:
+            filename, lines = item
+            output.write(f"--- Файл {filename} ---\n")
+            output.writelines(lines())
+        output.write("\n")
+
+
+def read_report_data(path):
+    if path == "-":
+        return json.load(sys.stdin)
+    with open(path, encoding="utf-8") as file:
+        return json.load(file)
+
+
+def write_report_data(data, path):
+    if path == "-":
+        json.dump(data, sys.stdout, ensure_ascii=False, indent=2)
+        sys.stdout.write("\n")
+        return
+    with open(path, "w", encoding="utf-8") as file:
+        json.dump(data, file, ensure_ascii=False, indent=2)
+
+
+def _load_data(args):
+    if args.input:
+        return read_report_data(args.input)
+    return fetch_report(args.period, args.mode, args.groups, args.portals)
+
+
+def _command_fetch(args):
+    write_report_data(_load_data(args), args.output)
+    return 0
+
+
+def _command_render(args):
+    from src.render import render_reports
+
+    data = read_report_data(args.input)
+    if args.output == "-":
+        render_reports(data["results"], {args.format: sys.stdout}, data["report_month"])
+        return 0
+    with open(args.output, "w", encoding="utf-8", newline="") as file:
+        render_reports(data["results"], {args.format: file}, data["report_month"])
+    return 0
+
+
+def _command_send(args):
+    return 0 if send_report(_load_data(args), args.format, args.thread) else 1
+
+
+def _command_dry_run(args):
+    print_outgoing(_load_data(args), args.format)
+    return 0
+
+
+def export_tasks(args):
+    """
+    Выгружает задачи за период в файл и/или отправляет выгрузку в Telegram.
+    CSV без -o уходит в Telegram потоком, без промежуточного файла.
+    :return: Словарь статусов групп {ID группы: None или текст ошибки}
+    """
+    from datetime import datetime
+
+    from src.periods import period_range
+    from src.task_export import (
+        export_csv,
+        export_parquet,
+        iter_csv_bytes,
+        iter_task_rows,
+        parse_columns,
+    )
+
+    start_date_api, end_date_api, _ = period_range(args.period, datetime.now())
+    if args.since:
+        start_date_api = f"{args.since}T00:00:00"
+    if args.until:
+        end_date_api = f"{args.until}T23:59:59"
+    columns = parse_columns(args.columns)
+    compression = args.compression
+    if args.format == "csv" and compression == "none":
+        compression = None
+    status = {}
+
+    def rows():
+        return iter_task_rows(
+            start_date_api, end_date_api, columns, args.groups, status
+        )
+
+    if args.output:
+        if args.format == "csv":
+            count = export_csv(rows(), columns, args.output, compression)
+        else:
+            count = export_parquet(
+                rows(), columns, args.output, compression or "snappy"
+            )
+        print(f"Выгружено задач: {count} -> {args.output}")
+
+    if args.send:
+        import constants
+        from src.tg_alert_cls import TelegramAlert
+
+        alert = TelegramAlert(
+            constants.B24REPORT_BOT,
+            constants.B24REPORT_CHAT_ID,
+            constants.B24REPORT_THREADS,
+        )
+        caption = f"Задачи с {start_date_api[:10]} по {end_date_api[:10]}"
+        if args.output:
+            alert.send_file(args.output, thread_name=args.thread, caption=caption)
+        else:
+            suffix = ".csv.gz" if compression == "gzip" else ".csv"
+            filename = f"tasks-{start_date_api[:10]}-{end_date_api[:10]}{suffix}"
+            # Повторная попытка отправки загрузит задачи заново
+            alert.send_file(
+                lambda: iter_csv_bytes(rows(), columns, compression),
+                thread_name=args.thread,
+                caption=caption,
+                filename=filename,
+            )
+    return status
+
+
+def _command_export(args):
+    status = export_tasks(args)
+    return 1 if any(status.values()) else 0
+
+
+COMMANDS = {
+    "fetch": _command_fetch,
+    "render": _command_render,
+    "send": _command_send,
+    "dry-run": _command_dry_run,
+    "export": _command_export,
+}
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog="b24report", description="Отчеты по завершенным задачам Bitrix24"
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    fetch_options = argparse.ArgumentParser(add_help=False)
+    fetch_options.add_argument("--period", choices=PERIODS, default="previous_month")
+    fetch_options.add_argument(
+        "--mode",
+        choices=FETCH_MODES,
+        default="cache",
+        help="cache - локальное хранилище, pages/batch/counts/async - напрямую из Bitrix24",
+    )
+    fetch_options.add_argument(
+        "--groups", type=int, nargs="+", help="ID групп (по умолчанию все)"
+    )
+    fetch_options.add_argument(
+        "--portals", help="JSON-файл порталов для сводного отчета"
+    )
+
+    fetch = commands.add_parser(
+        "fetch", parents=[fetch_options], help="Загрузить данные отчета в JSON"
+    )
+    fetch.add_argument("-o", "--output", default="-", help="Файл JSON (- для stdout)")
+    fetch.set_defaults(input=None)
+
+    render = commands.add_parser(
+        "render", help="Сформировать отчет из JSON команды fetch"
+    )
+    render.add_argument("-i", "--input", default="-", help="Файл JSON (- для stdin)")
+    render.add_argument("--format", choices=REPORT_FORMATS, default="text")
+    render.add_argument(
+        "-o", "--output", default="-", help="Файл отчета (- для stdout)"
+    )
+
+    for name, help_text in (
+        ("send", "Загрузить и отправить отчет в Telegram"),
+        ("dry-run", "Загрузить и показать, что было бы отправлено"),
+    ):
+        command = commands.add_parser(name, parents=[fetch_options], help=help_text)
+        command.add_argument(
+            "-i",
+            "--input",
+            help="Файл JSON команды fetch вместо загрузки (- для stdin)",
+        )
+        command.add_argument("--format", choices=REPORT_FORMATS, default="html")
+        command.add_argument("--thread", default=DEFAULT_THREAD, help="Тема в Telegram")
+
+    export = commands.add_parser(
+        "export", help="Подробная выгрузка задач в CSV или Parquet"
+    )
+    export.add_argument("--period", choices=PERIODS, default="previous_month")
+    export.add_argument("--since", help="Начало периода ГГГГ-ММ-ДД вместо --period")
+    export.add_argument("--until", help="Конец периода ГГГГ-ММ-ДД вместо --period")
+    export.add_argument(
+        "--groups", type=int, nargs="+", help="ID групп (по умолчанию все)"
+    )
+    export.add_argument(
+        "--columns",
+        default="id,group,responsible,title,closed_date",
+        help="Колонки через запятую: id, group_id, group, title, responsible_id, "
+        "responsible, created_date, closed_date, deadline, time_spent",
+    )
+    export.add_argument("--format", choices=("csv", "parquet"), default="csv")
+    export.add_argument(
+        "--compression",
+        choices=("none", "gzip", "snappy", "zstd"),
+        help="CSV: none или gzip; Parquet: snappy (по умолчанию), gzip, zstd или none",
+    )
+    export.add_argument("-o", "--output", help="Файл выгрузки")
+    export.add_argument(
+        "--send", action="store_true", help="Отправить выгрузку в Telegram"
+    )
+    export.add_argument("--thread", default=DEFAULT_THREAD, help="Тема в Telegram")
+
+    return parser
+
+
+def _validate_export_args(parser, args):
+    """
+    Проверяет параметры выгрузки до загрузки задач, чтобы ошибка была понятной.
+    """
+    from src.b24request import groups
+    from src.task_export import CSV_COMPRESSIONS, parse_columns
+
+    if args.format == "csv" and args.compression not in (
+        None,
+        "none",
+        *CSV_COMPRESSIONS,
+    ):
+        parser.error(f"сжатие {args.compression} поддерживается только для Parquet")
+    try:
+        parse_columns(args.columns)
+    except ValueError as e:
+        parser.error(str(e))
+    unknown = [group_id for group_id in args.groups or () if group_id not in groups]
+    if unknown:
+        parser.error(f"неизвестные группы: {unknown}")
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if getattr(args, "portals", None) and args.mode not in PORTAL_FETCH_MODES:
+        parser.error(f"--portals поддерживает режимы {', '.join(PORTAL_FETCH_MODES)}")
+    if args.command == "export" and not args.output:
+        if not args.send:
+            parser.error("укажите -o или --send")
+        if args.format == "parquet":
+            parser.error("Parquet отправляется в Telegram только из файла, укажите -o")
+    if args.command == "export":
+        _validate_export_args(parser, args)
+
+    try:
+        return COMMANDS[args.command](args)
+    finally:
+        import constants
+
+        # Метрики выгружаем и после неудачного запуска
+        if constants.B24REPORT_METRICS_PATH:
+            from src.metrics import recorder
+
+            recorder.export(constants.B24REPORT_METRICS_PATH)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
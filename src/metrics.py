@@ -0,0 +1,117 @@
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+# Префикс имен метрик Prometheus
+METRIC_PREFIX = "b24report"
+
+
+class MetricsRecorder:
+    def __init__(self):
+        """
+        Сборщик интервалов (spans) выполнения: имя, длительность и числовые атрибуты
+        (байты ответа, число задач, повторы и т.п.).
+        """
+        self.lock = threading.Lock()
+        self.spans = []
+
+    @contextmanager
+    def span(self, name, **attrs):
+        """
+        Замеряет длительность блока. Атрибуты можно дополнять внутри блока:
+
+            with span("b24_request", method=method) as attrs:
+                attrs["bytes"] = len(response.content)
+        """
+        started_at = time.time()
+        started = time.perf_counter()
+        try:
+            yield attrs
+        finally:
+            record = {
+                "span": name,
+                "start": round(started_at, 6),
+                "duration": time.perf_counter() - started,
+                **attrs,
+            }
+            with self.lock:
+                self.spans.append(record)
+
+    def clear(self):
+        with self.lock:
+            self.spans = []
+
+    def export_jsonl(self, path):
+        """
+        Дописывает интервалы в файл JSON Lines.
+        """
+        with self.lock:
+            spans = list(self.spans)
+        with open(path, "a", encoding="utf-8") as file:
+            for record in spans:
+                file.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+    def prometheus_text(self):
+        """
+        Сводит интервалы по имени в метрики Prometheus: количество и сумма
+        длительностей, а также суммы числовых атрибутов.
+        """
+        totals = {}
+        with self.lock:
+            spans = list(self.spans)
+        for record in spans:
+            total = totals.setdefault(
+                record["span"], {"count": 0, "seconds": 0.0, "attrs": {}}
+            )
+            total["count"] += 1
+            total["seconds"] += record["duration"]
+            for key, value in record.items():
+                if key in ("span", "start", "duration"):
+                    continue
+                if isinstance(value, (int, float)) and not isinstance(value, bool):
+                    total["attrs"][key] = total["attrs"].get(key, 0) + value
+
+        lines = [
+            f"# TYPE {METRIC_PREFIX}_span_seconds summary",
+        ]
+        for name, total in sorted(totals.items()):
+            lines.append(
+                f'{METRIC_PREFIX}_span_seconds_count{{span="{name}"}} {total["count"]}'
+            )
+            lines.append(
+                f'{METRIC_PREFIX}_span_seconds_sum{{span="{name}"}} {total["seconds"]:.6f}'
+            )
+        for name, total in sorted(totals.items()):
+            for key, value in sorted(total["attrs"].items()):
+                lines.append(
+                    f'{METRIC_PREFIX}_span_{key}_total{{span="{name}"}} {value}'
+                )
+        lines.append(f"{METRIC_PREFIX}_last_run_timestamp_seconds {time.time():.0f}")
+        return "\n".join(lines) + "\n"
+
+    def export_prometheus(self, path):
+        """
+        Записывает метрики в textfile для node exporter.
+        Файл подменяется атомарно, чтобы экспортер не прочитал его наполовину.
+        """
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as file:
+            file.write(self.prometheus_text())
+        os.replace(tmp_path, path)
+
+    def export(self, path):
+        """
+        Выгружает метрики в формате по расширению файла: .prom - Prometheus,
+        иначе JSON Lines.
+        """
+        if path.endswith(".prom"):
+            self.export_prometheus(path)
+        else:
+            self.export_jsonl(path)
+
+
+# Общий сборщик для процесса
+recorder = MetricsRecorder()
+span = recorder.span
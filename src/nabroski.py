@@ -1,8 +1,12 @@
+import sys
 from datetime import datetime, timedelta
 
 import requests
 
-from constants import TASK_DETAIL_URL
+from src.b24batch import fetch_lists_batched
+from src.render import iter_detail_lines, render_report
+from src.task_table import TaskTable
+from src.user_directory import get_directory
 
 # Группы с их ID
 groups = {
@@ -29,154 +33,129 @@ def get_previous_month_date_range():
     return start_date_api, end_date_api
 
 
-def fetch_task_statistics(start_date_api, end_date_api):
+def _build_list_params(group_id, start_date_api, end_date_api, select):
+    return {
+        "order": {"ID": "ASC"},  # Сортировка по ID
+        "filter": {
+            "GROUP_ID": group_id,  # Ищем задачи по группе
+            ">=CLOSED_DATE": start_date_api,  # Завершенные задачи после start_date
+            "<=CLOSED_DATE": end_date_api,  # Завершенные задачи до end_date
+            "STATUS": "5",  # Только завершенные задачи
+        },
+        "select": select,  # Поля, которые нужно получить
+    }
+
+
+def _fetch_group_tasks(
+    start_date_api, end_date_api, select, group_ids=None, status=None
+):
     """
-    Получает статистику завершенных задач для каждой группы за указанный период.
+    Получает все страницы задач групп через batch.
+    :param group_ids: ID групп для загрузки (по умолчанию все группы из groups)
+    :param status: Словарь, в который по ID группы записывается None при успехе
+        или текст ошибки (опционально)
+    :return: Словарь {ID группы: список задач} только для групп без ошибок
     """
-    results = {group_name: {} for group_name in groups.values()}
-
-    for group_id, group_name in groups.items():
-        params = {
-            "order": {"ID": "ASC"},  # Сортировка по ID
-            "filter": {
-                "GROUP_ID": group_id,  # Ищем задачи по группе
-                ">=CLOSED_DATE": start_date_api,  # Завершенные задачи после start_date
-                "<=CLOSED_DATE": end_date_api,  # Завершенные задачи до end_date
-                "STATUS": "5",  # Только завершенные задачи
-            },
-            "select": [
-                "id",
-                "title",
-                "responsibleId",
-                "responsible",
-                "closedDate",
-            ],  # Поля, которые нужно получить
-        }
-
-        try:
-            response = requests.post(TASK_DETAIL_URL, json=params)
-            response.raise_for_status()
-            data = response.json()
-        except requests.exceptions.RequestException as e:
-            print(f"Ошибка при запросе группы {group_name}: {e}")
-            continue
-        except ValueError:
-            print(f"Ошибка обработки JSON для группы {group_name}")
+    status = {} if status is None else status
+    selected = list(group_ids or groups)
+    list_params = {
+        group_id: _build_list_params(group_id, start_date_api, end_date_api, select)
+        for group_id in selected
+    }
+    errors = {}
+    try:
+        tasks_by_group = fetch_lists_batched(
+            list_params, "tasks.task.list", "tasks", errors=errors
+        )
+    except requests.exceptions.RequestException as e:
+        print(f"Ошибка при запросе batch: {e}")
+        status.update({group_id: str(e) for group_id in selected})
+        return {}
+    except ValueError:
+        print("Ошибка обработки JSON ответа batch")
+        status.update({group_id: "Некорректный JSON в ответе" for group_id in selected})
+        return {}
+
+    for group_id in selected:
+        if group_id in errors:
+            # Группа без части страниц в отчет не попадает, иначе она будет недосчитана
+            print(f"Ошибка при запросе группы {groups[group_id]}: {errors[group_id]}")
+            status[group_id] = str(errors[group_id])
+            tasks_by_group.pop(group_id, None)
             continue
+        status[group_id] = None
+    return tasks_by_group
 
-        tasks = data.get("result", {}).get("tasks", [])
-        if tasks:
-            for task in tasks:
-                responsible = task.get("responsible", {})
-                responsible_name = responsible.get("name", "Неизвестный")
-                closed_date = task.get("closedDate", "Неизвестно")
-                task_title = task.get("title", "Без названия")
 
-                # Инициализация данных для ответственного
-                if responsible_name not in results[group_name]:
-                    results[group_name][responsible_name] = {"count": 0, "tasks": []}
-
-                # Увеличиваем счетчик завершенных задач
-                results[group_name][responsible_name]["count"] += 1
+def fetch_task_statistics(start_date_api, end_date_api, group_ids=None, status=None):
+    """
+    Получает статистику завершенных задач для каждой группы за указанный период.
+    :param group_ids: ID групп для загрузки (по умолчанию все группы из groups)
+    :param status: Словарь статусов групп, как у _fetch_group_tasks (опционально)
+    :return: TaskTable с задачами групп, загруженных без ошибок
+    """
+    table = TaskTable()
+    tasks_by_group = _fetch_group_tasks(
+        start_date_api,
+        end_date_api,
+        ["id", "title", "responsibleId", "closedDate"],
+        group_ids,
+        status,
+    )
 
-                # Добавляем информацию о задаче
-                results[group_name][responsible_name]["tasks"].append(
-                    {"title": task_title, "closed_date": closed_date}
-                )
+    for group_id in list(tasks_by_group):
+        table.extend(group_id, tasks_by_group.pop(group_id))
 
-    return results
+    get_directory().fill_table(table)
+    return table
 
 
-def fetch_task_statistics_report(start_date_api, end_date_api):
+def fetch_task_statistics_report(
+    start_date_api, end_date_api, group_ids=None, status=None
+):
     """
     Получает сокращенную статистику завершенных задач для каждой группы за указанный период.
+    :param group_ids: ID групп для загрузки (по умолчанию все группы из groups)
+    :param status: Словарь статусов групп, как у _fetch_group_tasks (опционально)
     """
-    report_data = {group_name: {} for group_name in groups.values()}
-
-    for group_id, group_name in groups.items():
-        params = {
-            "order": {"ID": "ASC"},  # Сортировка по ID
-            "filter": {
-                "GROUP_ID": group_id,  # Фильтр по группе
-                ">=CLOSED_DATE": start_date_api,  # Завершенные задачи после start_date
-                "<=CLOSED_DATE": end_date_api,  # Завершенные задачи до end_date
-                "STATUS": "5",  # Только завершенные задачи
-            },
-            "select": ["responsibleId", "responsible"],  # Берем только нужные данные
-        }
-
-        try:
-            response = requests.post(TASK_DETAIL_URL, json=params)
-            response.raise_for_status()
-            data = response.json()
-        except requests.exceptions.RequestException as e:
-            print(f"Ошибка при запросе группы {group_name}: {e}")
-            continue
-        except ValueError:
-            print(f"Ошибка обработки JSON для группы {group_name}")
-            continue
-
-        tasks = data.get("result", {}).get("tasks", [])
-        if tasks:
-            for task in tasks:
-                responsible = task.get("responsible", {})
-                responsible_name = responsible.get("name", "Неизвестный")
-
-                # Инициализация данных для ответственного
-                if responsible_name not in report_data[group_name]:
-                    report_data[group_name][responsible_name] = 0
+    selected = {group_id: groups[group_id] for group_id in group_ids or groups}
+    table = TaskTable()
+    tasks_by_group = _fetch_group_tasks(
+        start_date_api, end_date_api, ["responsibleId"], group_ids, status
+    )
 
-                # Увеличиваем счетчик завершенных задач
-                report_data[group_name][responsible_name] += 1
+    for group_id in list(tasks_by_group):
+        table.extend(group_id, tasks_by_group.pop(group_id))
 
-    return report_data
+    get_directory().fill_table(table)
+    return table.to_report(selected)
 
 
 def generate_statistics_report(results):
     """
     Формирует строку с статистикой завершенных задач в читаемом формате.
     """
-    from datetime import datetime
+    return render_report(results, "text")
 
-    report_month = (datetime.now().replace(day=1) - timedelta(days=1)).strftime("%m.%Y")
-    report_str = f"Отчет за {report_month}\n"
 
-    for group_name, responsible_stats in results.items():
-        report_str += f"\nГруппа: {group_name}\n"
-        if not responsible_stats:
-            report_str += "  Нет завершенных задач за указанный период.\n"
-            continue
-        for responsible_name, count in responsible_stats.items():
-            report_str += f"  Ответственный: {responsible_name}\n"
-            report_str += f"    Завершенные задачи: {count}\n"
-    return report_str
-
-
-def print_statistics(results):
+def print_statistics(table):
     """
     Выводит статистику завершенных задач в читаемом формате.
+    :param table: TaskTable из fetch_task_statistics
     """
-    for group_name, responsible_stats in results.items():
-        print(f"\nГруппа: {group_name}")
-        if not responsible_stats:
-            print("  Нет завершенных задач за указанный период.")
-            continue
-        for responsible_name, stats in responsible_stats.items():
-            print(f"  Ответственный: {responsible_name}")
-            print(f"    Завершенные задачи: {stats['count']}")
-            print("    Список задач:")
-            for task in stats["tasks"]:
-                print(
-                    f"      - {task['title']} (Дата завершения: {task['closed_date']})"
-                )
+    sys.stdout.writelines(iter_detail_lines(table, groups))
 
 
 def main():
     start_date_api, end_date_api = get_previous_month_date_range()
     # results = fetch_task_statistics(start_date_api, end_date_api)
     # print_statistics(results)
-    results = fetch_task_statistics_report(start_date_api, end_date_api)
+    status = {}
+    results = fetch_task_statistics_report(start_date_api, end_date_api, status=status)
     print(generate_statistics_report(results))
+    failed = [groups[group_id] for group_id, error in status.items() if error]
+    if failed:
+        print(f"⚠️ Данные групп могут быть неполными: {', '.join(failed)}")
 
 
 if __name__ == "__main__":
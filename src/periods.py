@@ -0,0 +1,144 @@
+from bisect import bisect_left, bisect_right
+from collections import Counter
+from datetime import datetime, timedelta
+
+from src.b24request import fetch_groups_table, groups
+from src.render import previous_month_label
+from src.task_table import disambiguate_names, parse_closed_date
+from src.user_directory import get_directory
+
+
+def month_range(year, month):
+    """
+    Возвращает начало и конец месяца в формате для API.
+    """
+    first_day = datetime(year, month, 1)
+    next_month = (first_day + timedelta(days=32)).replace(day=1)
+    last_day = next_month - timedelta(days=1)
+    return first_day.strftime("%Y-%m-%dT00:00:00"), last_day.strftime(
+        "%Y-%m-%dT23:59:59"
+    )
+
+
+def last_months_ranges(count, today=None):
+    """
+    Возвращает диапазоны последних count завершенных месяцев.
+    :return: {"ММ.ГГГГ": (начало, конец)} от старых к новым
+    """
+    month_start = (today or datetime.now()).replace(day=1)
+    months = []
+    for _ in range(count):
+        month_start = (month_start - timedelta(days=1)).replace(day=1)
+        months.append(month_start)
+
+    return {
+        month.strftime("%m.%Y"): month_range(month.year, month.month)
+        for month in reversed(months)
+    }
+
+
+def quarter_range(year, quarter):
+    """
+    Возвращает начало и конец квартала (1-4) в формате для API.
+    """
+    first_month = 3 * (quarter - 1) + 1
+    return month_range(year, first_month)[0], month_range(year, first_month + 2)[1]
+
+
+def year_to_date_range(today=None):
+    """
+    Возвращает диапазон с начала года по текущий день.
+    """
+    today = today or datetime.now()
+    return today.strftime("%Y-01-01T00:00:00"), today.strftime("%Y-%m-%dT23:59:59")
+
+
+def period_range(period, today):
+    """
+    Возвращает (начало, конец, подпись) периода отчета.
+    :param period: previous_month, current_month, previous_quarter или year_to_date
+    """
+    if period == "previous_month":
+        last_month = today.replace(day=1) - timedelta(days=1)
+        start_date_api, end_date_api = month_range(last_month.year, last_month.month)
+        return start_date_api, end_date_api, previous_month_label(today)
+    if period == "current_month":
+        start_date_api, _ = month_range(today.year, today.month)
+        return (
+            start_date_api,
+            today.strftime("%Y-%m-%dT23:59:59"),
+            today.strftime("%m.%Y"),
+        )
+    if period == "previous_quarter":
+        quarter = (today.month - 1) // 3
+        year = today.year if quarter else today.year - 1
+        quarter = quarter or 4
+        start_date_api, end_date_api = quarter_range(year, quarter)
+        return start_date_api, end_date_api, f"{quarter} кв. {year}"
+    if period == "year_to_date":
+        start_date_api, end_date_api = year_to_date_range(today)
+        return start_date_api, end_date_api, f"{today.year} (с начала года)"
+    raise ValueError(f"Неизвестный период: {period}")
+
+
+def fetch_multi_period_report(
+    periods,
+    group_ids=None,
+    status=None,
+    group_map=None,
+    client=None,
+    directory=None,
+):
+    """
+    Получает сокращенную статистику сразу за несколько периодов одним проходом.
+    Задачи загружаются один раз за объединенный диапазон, упорядочиваются по дате
+    закрытия, и каждый период выбирается из этого индекса бинарным поиском.
+    :param periods: Словарь {название периода: (начало, конец)}
+    :param group_ids: ID групп для загрузки (по умолчанию все группы из groups)
+    :param status: Словарь, в который по ID группы записывается None при успехе
+        или текст ошибки; данные группы с ошибкой в отчет не попадают (опционально)
+    :param group_map: Словарь {ID группы: название} вместо groups (опционально)
+    :param client: B24Client портала (по умолчанию общий клиент)
+    :param directory: UserDirectory портала (по умолчанию общий справочник)
+    :return: {название периода: {название группы: {ответственный: количество}}}
+    """
+    group_map = group_map or groups
+    directory = directory or get_directory()
+    selected = {group_id: group_map[group_id] for group_id in group_ids or group_map}
+    union_start = min(start for start, _ in periods.values())
+    union_end = max(end for _, end in periods.values())
+
+    table = fetch_groups_table(
+        union_start,
+        union_end,
+        ["responsibleId", "closedDate"],
+        group_ids=list(selected),
+        status=status,
+        group_map=group_map,
+        client=client,
+    )
+    directory.fill_table(table)
+    # Индексы задач в порядке даты закрытия
+    order = sorted(range(len(table)), key=table.closed_ts.__getitem__)
+    closed_ts = [table.closed_ts[i] for i in order]
+
+    reports = {}
+    for period_name, (start, end) in periods.items():
+        lo = bisect_left(closed_ts, parse_closed_date(start))
+        hi = bisect_right(closed_ts, parse_closed_date(end))
+        # Считаем по ID ответственного, чтобы не склеивать однофамильцев
+        counts = Counter(
+            (table.group_id[i], table.responsible_id[i]) for i in order[lo:hi]
+        )
+        names = disambiguate_names(
+            {
+                responsible_id: table.responsible_name(responsible_id)
+                for _, responsible_id in counts
+            }
+        )
+        report_data = {group_name: {} for group_name in selected.values()}
+        for (group_id, responsible_id), count in counts.items():
+            report_data[selected[group_id]][names[responsible_id]] = count
+        reports[period_name] = report_data
+
+    return reports
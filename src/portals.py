@@ -0,0 +1,208 @@
+"""
+Сводный отчет по нескольким порталам Bitrix24.
+
+У каждого портала свой вебхук, свои группы и свой бюджет запросов: отдельный
+B24Client (пул соединений, размыкатель, ведро токенов) и справочник пользователей.
+Порталы загружаются параллельно, медленный или недоступный портал не расходует
+лимиты остальных.
+
+    python -m src.portals portals.json --mode batch
+"""
+
+import argparse
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import constants
+from src.b24client import B24Client
+from src.b24request import (
+    fetch_task_statistics_report,
+    fetch_task_statistics_report_batch,
+    fetch_task_statistics_report_counts,
+    generate_statistics_report,
+    get_previous_month_date_range,
+)
+from src.user_directory import UserDirectory
+
+# Bitrix24 гарантирует порталу 2 запроса в секунду
+DEFAULT_RATE = 2.0
+DEFAULT_CONCURRENCY = 2
+
+FETCH_MODES = {
+    "pages": fetch_task_statistics_report,
+    "batch": fetch_task_statistics_report_batch,
+    "counts": fetch_task_statistics_report_counts,
+}
+
+
+class Portal:
+    def __init__(
+        self,
+        name,
+        webhook_url,
+        group_map,
+        rate=DEFAULT_RATE,
+        burst=None,
+        concurrency=DEFAULT_CONCURRENCY,
+    ):
+        """
+        Портал Bitrix24
+        :param name: Короткое название, которым подписываются группы в сводном отчете
+        :param webhook_url: URL вебхука портала
+        :param group_map: Словарь {ID группы: название}
+        :param rate: Допустимое число запросов в секунду к порталу
+        :param burst: Допустимый всплеск запросов (по умолчанию rate)
+        :param concurrency: Сколько групп портала загружается параллельно
+        """
+        self.name = name
+        self.group_map = group_map
+        self.concurrency = concurrency
+        self.client = B24Client(
+            webhook_url, pool_size=concurrency, rate=rate, burst=burst
+        )
+        self.directory = UserDirectory(
+            path=f"users_cache_{name}.json", client=self.client
+        )
+
+    def group_label(self, group_name):
+        return f"{self.name}: {group_name}"
+
+
+def load_portals(path):
+    """
+    Читает описание порталов из JSON-файла.
+    Вебхук задается в webhook_url или берется из переменной окружения webhook_env,
+    чтобы не хранить секреты в конфигурации.
+    """
+    with open(path, encoding="utf-8") as file:
+        config = json.load(file)
+    # Вебхуки из webhook_env могут лежать в .env, как и TASK_DETAIL_URL
+    constants.load_env()
+
+    if not config.get("portals"):
+        raise ValueError(f"{path}: не описано ни одного портала")
+
+    portals = []
+    names = set()
+    for portal in config["portals"]:
+        if portal["name"] in names:
+            raise ValueError(f"Портал {portal['name']} описан дважды")
+        names.add(portal["name"])
+        webhook_url = portal.get("webhook_url") or os.getenv(
+            portal.get("webhook_env", "")
+        )
+        if not webhook_url:
+            raise ValueError(f"Портал {portal['name']}: не задан вебхук")
+        if not portal.get("groups"):
+            raise ValueError(f"Портал {portal['name']}: не заданы группы")
+        if portal.get("concurrency", DEFAULT_CONCURRENCY) < 1:
+            raise ValueError(
+                f"Портал {portal['name']}: concurrency должно быть не меньше 1"
+            )
+        portals.append(
+            Portal(
+                portal["name"],
+                webhook_url,
+                {int(group_id): name for group_id, name in portal["groups"].items()},
+                rate=portal.get("rate", DEFAULT_RATE),
+                burst=portal.get("burst"),
+                concurrency=portal.get("concurrency", DEFAULT_CONCURRENCY),
+            )
+        )
+    return portals
+
+
+def fetch_portal_report(
+    portal, start_date_api, end_date_api, mode="batch", status=None
+):
+    """
+    Загружает статистику групп одного портала. Группы делятся на concurrency
+    частей, каждая часть загружается в своем потоке через клиент портала.
+    :param mode: Способ загрузки из FETCH_MODES
+    :param status: Словарь статусов групп портала, как у fetch_task_statistics_report
+    :return: {название группы: {ответственный: количество}}
+    """
+    fetch = FETCH_MODES[mode]
+    status = {} if status is None else status
+    group_ids = list(portal.group_map)
+    parts = [group_ids[i :: portal.concurrency] for i in range(portal.concurrency)]
+
+    with ThreadPoolExecutor(portal.concurrency) as executor:
+        futures = [
+            executor.submit(
+                fetch,
+                start_date_api,
+                end_date_api,
+                group_ids=part,
+                status=status,
+                group_map=portal.group_map,
+                client=portal.client,
+                directory=portal.directory,
+            )
+            for part in parts
+            if part
+        ]
+        results = {}
+        for future in futures:
+            results.update(future.result())
+
+    return {
+        group_name: results.get(group_name, {})
+        for group_name in portal.group_map.values()
+    }
+
+
+def fetch_portals_report(
+    portals, start_date_api, end_date_api, mode="batch", status=None
+):
+    """
+    Параллельно загружает все порталы и сводит их в один отчет.
+    :param status: Словарь, в который по названию портала записываются статусы его групп
+    :return: {"портал: группа": {ответственный: количество}} в порядке порталов и групп
+    """
+    status = {} if status is None else status
+    with ThreadPoolExecutor(len(portals)) as executor:
+        futures = [
+            executor.submit(
+                fetch_portal_report,
+                portal,
+                start_date_api,
+                end_date_api,
+                mode,
+                status.setdefault(portal.name, {}),
+            )
+            for portal in portals
+        ]
+        report_data = {}
+        for portal, future in zip(portals, futures):
+            for group_name, responsible_stats in future.result().items():
+                report_data[portal.group_label(group_name)] = responsible_stats
+    return report_data
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Сводный отчет по нескольким порталам Bitrix24"
+    )
+    parser.add_argument("config", help="JSON-файл с описанием порталов")
+    parser.add_argument("--mode", choices=FETCH_MODES, default="batch")
+    args = parser.parse_args(argv)
+
+    portals = load_portals(args.config)
+    start_date_api, end_date_api = get_previous_month_date_range()
+    status = {}
+    results = fetch_portals_report(
+        portals, start_date_api, end_date_api, args.mode, status
+    )
+    print(generate_statistics_report(results))
+
+    for portal in portals:
+        failed = [group_id for group_id, error in status[portal.name].items() if error]
+        if failed:
+            names = ", ".join(portal.group_map[group_id] for group_id in failed)
+            print(f"⚠️ {portal.name}: данные групп могут быть неполными: {names}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,204 @@
+import csv
+import html
+import io
+import json
+from datetime import datetime, timedelta
+from itertools import groupby
+
+from src.metrics import span
+
+NO_TASKS = "Нет завершенных задач за указанный период."
+
+
+def previous_month_label(today=None):
+    """
+    Возвращает предыдущий месяц в формате ММ.ГГГГ.
+    """
+    today = today or datetime.now()
+    return (today.replace(day=1) - timedelta(days=1)).strftime("%m.%Y")
+
+
+class TextFormat:
+    """
+    Отчет в читаемом текстовом формате.
+    """
+
+    def begin(self, report_month):
+        yield f"Отчет за {report_month}\n"
+
+    def group(self, group_name, responsible_stats):
+        yield f"\nГруппа: {group_name}\n"
+        if not responsible_stats:
+            yield f"  {NO_TASKS}\n"
+            return
+        for responsible_name, count in responsible_stats.items():
+            yield f"  Ответственный: {responsible_name}\n"
+            yield f"    Завершенные задачи: {count}\n"
+
+    def end(self):
+        return ()
+
+
+class HtmlFormat:
+    """
+    Отчет в HTML-формате для Telegram с ровным форматированием.
+    """
+
+    def begin(self, report_month):
+        yield f"<b>Отчет за {report_month}</b>\n"
+        yield "\n"
+
+    def group(self, group_name, responsible_stats):
+        yield f"🟢 <b>{html.escape(group_name)}</b>\n"
+        if not responsible_stats:
+            yield f"  {NO_TASKS}\n"
+            yield "\n"
+            return
+
+        yield "<pre>\n"
+        yield f"{'И.Ф':<22} | {'Закрыто'}\n"
+        yield f"{'-' * 22}-|{'-' * 7}\n"
+
+        # 🔹 Сортируем список по убыванию количества закрытых задач
+        sorted_responsibles = sorted(
+            responsible_stats.items(), key=lambda x: x[1], reverse=True
+        )
+
+        for responsible_name, count in sorted_responsibles:
+            # Выравниваем по исходному имени, экранируем после
+            yield f"{html.escape(f'{responsible_name:<22}')} | {count}\n"
+
+        yield "</pre>\n"  # Закрываем <pre>
+
+    def end(self):
+        return ()
+
+
+class CsvFormat:
+    """
+    Отчет в CSV: одна строка на пару (группа, ответственный).
+    """
+
+    def __init__(self):
+        self.buffer = io.StringIO()
+        self.writer = csv.writer(self.buffer, lineterminator="\n")
+
+    def _row(self, row):
+        # csv.writer пишет в буфер, отдаем и очищаем его после каждой строки
+        self.writer.writerow(row)
+        line = self.buffer.getvalue()
+        self.buffer.seek(0)
+        self.buffer.truncate()
+        return line
+
+    def begin(self, report_month):
+        yield self._row(["report_month", "group", "responsible", "closed"])
+        self.report_month = report_month
+
+    def group(self, group_name, responsible_stats):
+        for responsible_name, count in responsible_stats.items():
+            yield self._row([self.report_month, group_name, responsible_name, count])
+
+    def end(self):
+        return ()
+
+
+class JsonFormat:
+    """
+    Отчет в JSON: {"report_month": ..., "groups": {группа: {ответственный: количество}}}.
+    """
+
+    def begin(self, report_month):
+        self.first = True
+        yield f'{{"report_month": {json.dumps(report_month)}, "groups": {{'
+
+    def group(self, group_name, responsible_stats):
+        separator = "" if self.first else ", "
+        self.first = False
+        yield (
+            f"{separator}{json.dumps(group_name, ensure_ascii=False)}: "
+            f"{json.dumps(responsible_stats, ensure_ascii=False)}"
+        )
+
+    def end(self):
+        yield "}}\n"
+
+
+FORMATS = {
+    "text": TextFormat,
+    "html": HtmlFormat,
+    "csv": CsvFormat,
+    "json": JsonFormat,
+}
+
+
+def iter_report_lines(results, fmt="text", report_month=None):
+    """
+    Лениво отдает строки отчета в указанном формате.
+    :param results: {название группы: {ответственный: количество}}
+    :param fmt: Формат отчета: text, html, csv или json
+    :param report_month: Подпись периода (по умолчанию предыдущий месяц)
+    """
+    report_format = FORMATS[fmt]()
+    yield from report_format.begin(report_month or previous_month_label())
+    for group_name, responsible_stats in results.items():
+        yield from report_format.group(group_name, responsible_stats)
+    yield from report_format.end()
+
+
+def render_reports(results, outputs, report_month=None):
+    """
+    Записывает отчет сразу в нескольких форматах за один проход по данным.
+    :param outputs: Словарь {формат: файловый объект}
+    """
+    report_month = report_month or previous_month_label()
+    formats = {fmt: FORMATS[fmt]() for fmt in outputs}
+
+    with span("render", formats=len(formats)):
+        for fmt, report_format in formats.items():
+            outputs[fmt].writelines(report_format.begin(report_month))
+        for group_name, responsible_stats in results.items():
+            for fmt, report_format in formats.items():
+                outputs[fmt].writelines(
+                    report_format.group(group_name, responsible_stats)
+                )
+        for fmt, report_format in formats.items():
+            outputs[fmt].writelines(report_format.end())
+
+
+def render_report(results, fmt="text", report_month=None):
+    """
+    Возвращает отчет в указанном формате одной строкой.
+    """
+    with span("render", formats=1) as attrs:
+        buffer = io.StringIO()
+        buffer.writelines(iter_report_lines(results, fmt, report_month))
+        attrs["chars"] = buffer.tell()
+    return buffer.getvalue()
+
+
+def iter_detail_lines(table, groups):
+    """
+    Лениво отдает подробный отчет со списком задач каждого ответственного.
+    :param table: TaskTable с задачами
+    :param groups: Словарь {ID группы: название группы}
+    """
+    names = table.display_names()
+    counts = table.count_by_group_responsible()
+    rows_by_group = {
+        group_id: list(group_rows)
+        for group_id, group_rows in groupby(table.iter_rows(), key=lambda row: row[0])
+    }
+
+    for group_id, group_name in groups.items():
+        yield f"\nГруппа: {group_name}\n"
+        group_rows = rows_by_group.get(group_id)
+        if not group_rows:
+            yield f"  {NO_TASKS}\n"
+            continue
+        for responsible_id, task_rows in groupby(group_rows, key=lambda row: row[1]):
+            yield f"  Ответственный: {names[responsible_id]}\n"
+            yield f"    Завершенные задачи: {counts[(group_id, responsible_id)]}\n"
+            yield "    Список задач:\n"
+            for _, _, closed_date, title in task_rows:
+                yield f"      - {title} (Дата завершения: {closed_date})\n"
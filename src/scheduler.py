@@ -0,0 +1,285 @@
+"""
+Планировщик отчетов: запускает описанные в конфигурации отчеты по расписанию
+в одном долгоживущем процессе.
+
+    python -m src.scheduler reports.json
+    python -m src.scheduler reports.json --once   # все отчеты сразу и выход
+"""
+
+import argparse
+import html
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+import constants
+from src.b24request import groups, iter_html_report_chunks
+from src.metrics import recorder
+from src.periods import fetch_multi_period_report, period_range
+from src.render import FORMATS, iter_report_lines, render_report
+from src.tg_alert_cls import TelegramAlert
+from src.tg_queue import TelegramSendQueue
+
+DEFAULT_WORKERS = 4
+
+# Границы полей cron: минута, час, день месяца, месяц, день недели
+# (воскресенье - 0 или 7)
+_CRON_FIELDS = ((0, 59), (0, 23), (1, 31), (1, 12), (0, 7))
+
+
+def _parse_cron_field(field, low, high):
+    values = set()
+    for part in field.split(","):
+        value_range, _, step = part.partition("/")
+        if value_range == "*":
+            start, end = low, high
+        elif "-" in value_range:
+            start, end = (int(value) for value in value_range.split("-"))
+        else:
+            start = end = int(value_range)
+        if not low <= start <= end <= high:
+            raise ValueError(f"Значение вне диапазона {low}-{high}: {part}")
+        values.update(range(start, end + 1, int(step or 1)))
+    return values
+
+
+class CronSchedule:
+    def __init__(self, expression):
+        """
+        Расписание в формате cron из пяти полей: "мин час день месяц день_недели".
+        Поддерживаются *, списки через запятую, диапазоны и шаг (*/15).
+        Как и в cron, если ограничены и день месяца, и день недели, достаточно
+        совпадения любого из них.
+        """
+        fields = expression.split()
+        if len(fields) != 5:
+            raise ValueError(f"Ожидается 5 полей cron: {expression}")
+        self.expression = expression
+        self.minutes, self.hours, self.days, self.months, self.weekdays = (
+            _parse_cron_field(field, low, high)
+            for field, (low, high) in zip(fields, _CRON_FIELDS)
+        )
+        if 7 in self.weekdays:
+            self.weekdays = (self.weekdays - {7}) | {0}
+        self.any_day = fields[2].startswith("*")
+        self.any_weekday = fields[4].startswith("*")
+
+    def matches(self, moment):
+        day_matches = moment.day in self.days
+        # В cron неделя начинается с воскресенья, в Python - с понедельника
+        weekday_matches = (moment.weekday() + 1) % 7 in self.weekdays
+        if self.any_day or self.any_weekday:
+            day_matches = day_matches and weekday_matches
+        else:
+            day_matches = day_matches or weekday_matches
+        return (
+            moment.minute in self.minutes
+            and moment.hour in self.hours
+            and moment.month in self.months
+            and day_matches
+        )
+
+
+class ReportDefinition:
+    def __init__(self, config, group_map):
+        """
+        Описание одного отчета из конфигурации
+        :param config: Словарь с ключами name, schedule, groups, period, format, thread
+        :param group_map: Все известные группы {ID: название}
+        """
+        self.name = config["name"]
+        self.schedule = CronSchedule(config["schedule"])
+        self.group_ids = [
+            int(group_id) for group_id in config.get("groups") or group_map
+        ]
+        self.period = config.get("period", "previous_month")
+        self.format = config.get("format", "html")
+        self.thread = config.get("thread")
+
+        unknown = [group_id for group_id in self.group_ids if group_id not in group_map]
+        if unknown:
+            raise ValueError(f"Отчет {self.name}: неизвестные группы {unknown}")
+        # Ошибки конфигурации ловим при загрузке, а не в момент запуска отчетов
+        if self.format not in FORMATS:
+            raise ValueError(
+                f"Отчет {self.name}: неизвестный формат {self.format}. "
+                f"Доступны: {', '.join(FORMATS)}"
+            )
+        try:
+            period_range(self.period, datetime.now())
+        except ValueError as e:
+            raise ValueError(f"Отчет {self.name}: {e}")
+
+
+class ReportScheduler:
+    def __init__(self, config_path):
+        """
+        Планировщик отчетов
+        :param config_path: Путь к JSON-файлу с описанием групп и отчетов
+        """
+        with open(config_path, encoding="utf-8") as file:
+            config = json.load(file)
+
+        self.group_map = {
+            int(group_id): name
+            for group_id, name in (config.get("groups") or groups).items()
+        }
+        self.reports = [
+            ReportDefinition(report, self.group_map) for report in config["reports"]
+        ]
+        self.executor = ThreadPoolExecutor(config.get("workers", DEFAULT_WORKERS))
+        # Запуски выполняются по очереди в отдельном потоке, не задерживая отсчет минут
+        self.runner = ThreadPoolExecutor(1)
+        # Один бот на весь процесс: его сессия и ограничитель живут между запусками
+        self.alert = TelegramAlert(
+            constants.B24REPORT_BOT,
+            constants.B24REPORT_CHAT_ID,
+            config.get("threads") or constants.B24REPORT_THREADS,
+        )
+        # Отчеты готовятся параллельно, а в Telegram уходят из одной очереди,
+        # так что потоки загрузки не ждут пауз ограничителя
+        self.sender = TelegramSendQueue(self.alert)
+
+    def due(self, moment):
+        return [report for report in self.reports if report.schedule.matches(moment)]
+
+    def run(self, reports, today=None):
+        """
+        Выполняет отчеты. Пересекающиеся периоды объединяются: задачи групп всех
+        отчетов загружаются одним проходом за общий диапазон, и каждый отчет
+        получает срез своего периода и своих групп.
+        """
+        today = today or datetime.now()
+        periods = {
+            report.name: period_range(report.period, today) for report in reports
+        }
+
+        # Периоды по возрастанию начала; соседние пересекающиеся попадают в одну загрузку
+        windows = sorted({(start, end) for start, end, _ in periods.values()})
+        plan = []
+        for start_date_api, end_date_api in windows:
+            if plan and start_date_api <= plan[-1]["end"]:
+                plan[-1]["end"] = max(plan[-1]["end"], end_date_api)
+                plan[-1]["windows"].append((start_date_api, end_date_api))
+            else:
+                plan.append(
+                    {"end": end_date_api, "windows": [(start_date_api, end_date_api)]}
+                )
+
+        fetches = {}
+        for fetch in plan:
+            group_ids = {
+                group_id
+                for report in reports
+                if periods[report.name][:2] in fetch["windows"]
+                for group_id in report.group_ids
+            }
+            status = {}
+            future = self.executor.submit(
+                fetch_multi_period_report,
+                {window: window for window in fetch["windows"]},
+                group_ids=sorted(group_ids),
+                status=status,
+                group_map=self.group_map,
+            )
+            for window in fetch["windows"]:
+                fetches[window] = (future, status)
+
+        sends = []
+        for report in reports:
+            start_date_api, end_date_api, label = periods[report.name]
+            window = (start_date_api, end_date_api)
+            future, status = fetches[window]
+            sends.append(
+                self.executor.submit(self._send, report, future, window, status, label)
+            )
+        for send in sends:
+            send.result()
+        self.sender.join()
+
+    def _send(self, report, fetch_future, window, status, label):
+        results = fetch_future.result()[window]
+        report_results = {
+            self.group_map[group_id]: results.get(self.group_map[group_id], {})
+            for group_id in report.group_ids
+        }
+        print(f"Отправка отчета {report.name} за {label}")
+
+        if report.format == "html":
+            self.sender.put_message(
+                iter_html_report_chunks(report_results, report_month=label),
+                report.thread,
+            )
+        elif report.format == "text":
+            text = render_report(report_results, "text", label)
+            self.sender.put_message(html.escape(text), report.thread)
+        else:
+            self._send_document(report, report_results, label)
+
+        failed = [group_id for group_id in report.group_ids if status.get(group_id)]
+        if failed:
+            failed_names = ", ".join(self.group_map[group_id] for group_id in failed)
+            self.sender.put_message(
+                f"⚠️ Данные групп могут быть неполными: {html.escape(failed_names)}",
+                report.thread,
+            )
+
+    def _send_document(self, report, report_results, label):
+        # Отчет формируется прямо в тело запроса, без временного файла
+        self.sender.put_file(
+            lambda: iter_report_lines(report_results, report.format, label),
+            thread_name=report.thread,
+            caption=f"{report.name}: {label}",
+            filename=f"{report.name}.{report.format}",
+        )
+
+    def _run_scheduled(self, reports, moment):
+        try:
+            self.run(reports, moment)
+        except Exception as e:
+            # Ошибка одного запуска не должна останавливать планировщик
+            print(f"Ошибка при выполнении отчетов: {e}")
+        if constants.B24REPORT_METRICS_PATH:
+            recorder.export(constants.B24REPORT_METRICS_PATH)
+        # Интервалы копятся в памяти, поэтому очищаем их после каждого запуска
+        recorder.clear()
+
+    def serve_forever(self):
+        """
+        Раз в минуту ставит в очередь отчеты, расписание которых совпало с минутой.
+        Если цикл проснулся позже, проверяются все пропущенные минуты, чтобы
+        долгий запуск или задержка процесса не отменяли отчеты.
+        """
+        print(f"Планировщик запущен, отчетов: {len(self.reports)}")
+        last = datetime.now().replace(second=0, microsecond=0) - timedelta(minutes=1)
+        while True:
+            now = datetime.now().replace(second=0, microsecond=0)
+            while last < now:
+                last += timedelta(minutes=1)
+                reports = self.due(last)
+                if reports:
+                    self.runner.submit(self._run_scheduled, reports, last)
+            next_minute = now + timedelta(minutes=1)
+            time.sleep(max(0, (next_minute - datetime.now()).total_seconds()))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Планировщик отчетов Bitrix24")
+    parser.add_argument("config", help="JSON-файл с описанием отчетов")
+    parser.add_argument(
+        "--once", action="store_true", help="Выполнить все отчеты и выйти"
+    )
+    args = parser.parse_args(argv)
+
+    scheduler = ReportScheduler(args.config)
+    if args.once:
+        scheduler.run(scheduler.reports)
+        if constants.B24REPORT_METRICS_PATH:
+            recorder.export(constants.B24REPORT_METRICS_PATH)
+        return
+    scheduler.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
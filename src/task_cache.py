@@ -0,0 +1,279 @@
+import sqlite3
+import time
+
+import requests
+
+from src.b24client import get_client
+from src.b24request import groups, iter_group_tasks
+from src.task_table import disambiguate_names
+from src.user_directory import get_directory
+
+DEFAULT_CACHE_PATH = "tasks_cache.sqlite3"
+# Сколько раз повторять синхронизацию групп, которые не удалось загрузить
+SYNC_ATTEMPTS = 3
+# Базовая пауза перед повтором синхронизации, в секундах
+SYNC_RETRY_DELAY = 5
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS tasks (
+    id INTEGER PRIMARY KEY,
+    group_id INTEGER NOT NULL,
+    responsible_id INTEGER,
+    title TEXT,
+    closed_date TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS tasks_group_closed ON tasks (group_id, closed_date);
+CREATE TABLE IF NOT EXISTS sync_state (
+    group_id INTEGER PRIMARY KEY,
+    high_water TEXT NOT NULL,
+    low_water TEXT
+);
+"""
+
+
+class TaskCache:
+    def __init__(self, path=DEFAULT_CACHE_PATH, directory=None):
+        """
+        Локальное хранилище завершенных задач в SQLite.
+        Для каждой группы хранится покрытый синхронизацией интервал дат закрытия
+        [low_water, high_water]: новые задачи дозагружаются после high_water,
+        а запрос периода раньше low_water догружает недостающую историю.
+        :param path: Путь к файлу базы
+        :param directory: UserDirectory для имен ответственных (опционально)
+        """
+        self.path = path
+        self.directory = directory or get_directory()
+        self.conn = sqlite3.connect(path)
+        self.conn.executescript(_SCHEMA)
+        self._migrate()
+
+    def _migrate(self):
+        # Базы прежних версий не знают нижней границы синхронизации
+        columns = {row[1] for row in self.conn.execute("PRAGMA table_info(sync_state)")}
+        if "low_water" not in columns:
+            self.conn.execute("ALTER TABLE sync_state ADD COLUMN low_water TEXT")
+            self.conn.commit()
+
+    def close(self):
+        self.conn.close()
+
+    def coverage(self, group_id):
+        """
+        Возвращает (low_water, high_water) группы или (None, None), если группа
+        еще не синхронизировалась. Для баз прежних версий low_water неизвестна
+        и считается равной high_water, чтобы история догрузилась заново.
+        """
+        row = self.conn.execute(
+            "SELECT low_water, high_water FROM sync_state WHERE group_id = ?",
+            (group_id,),
+        ).fetchone()
+        if not row:
+            return None, None
+        return row[0] or row[1], row[1]
+
+    def high_water(self, group_id):
+        """
+        Возвращает дату закрытия последней синхронизированной задачи группы.
+        """
+        return self.coverage(group_id)[1]
+
+    def _load(self, group_id, params, rows):
+        """
+        Загружает задачи по params в список rows.
+        Строки дописываются по мере загрузки, поэтому после обрыва в rows
+        остается все, что успели получить.
+        :param rows: Список для строк (id, группа, ID ответственного, название, дата закрытия)
+        """
+        for task in iter_group_tasks(params):
+            # Отбрасываем часовой пояс: фильтры API работают во времени портала
+            closed_date = (task.get("closedDate") or "")[:19]
+            if not closed_date:
+                continue
+            rows.append(
+                (
+                    int(task["id"]),
+                    group_id,
+                    int(task.get("responsibleId") or 0),
+                    task.get("title", "Без названия"),
+                    closed_date,
+                )
+            )
+
+    def sync_group(self, group_id, since):
+        """
+        Дозагружает задачи группы: сначала недостающую историю с since, если
+        запрошен более ранний период, затем задачи, закрытые после последней синхронизации.
+        :param group_id: ID группы
+        :param since: Дата, с которой в кэше должны быть все задачи группы
+        :return: Количество загруженных задач
+        """
+        low_water, high_water = self.coverage(group_id)
+        if high_water is None:
+            low_water = high_water = since
+            self._save_state(group_id, low_water, high_water)
+
+        loaded = 0
+        if since < low_water:
+            loaded += self._backfill(group_id, since, low_water)
+            low_water = since
+
+        params = {
+            "order": {"CLOSED_DATE": "ASC"},
+            "filter": {
+                "GROUP_ID": group_id,
+                ">CLOSED_DATE": high_water,  # Только новые задачи
+                "STATUS": "5",  # Только завершенные задачи
+            },
+            "select": ["id", "title", "responsibleId", "closedDate"],
+        }
+        rows = []
+        try:
+            self._load(group_id, params, rows)
+        finally:
+            # Фиксируем то, что успели загрузить, даже если запрос прервался
+            if rows:
+                high_water = max(high_water, max(row[4] for row in rows))
+            self._store(rows)
+            self._save_state(group_id, low_water, high_water)
+        return loaded + len(rows)
+
+    def _backfill(self, group_id, since, low_water):
+        """
+        Догружает историю группы [since, low_water] от новых задач к старым,
+        чтобы после обрыва покрытый интервал оставался непрерывным.
+        """
+        params = {
+            "order": {"CLOSED_DATE": "DESC"},
+            "filter": {
+                "GROUP_ID": group_id,
+                ">=CLOSED_DATE": since,
+                # Включительно: задачи с той же датой могли не попасть в прошлый проход
+                "<=CLOSED_DATE": low_water,
+                "STATUS": "5",
+            },
+            "select": ["id", "title", "responsibleId", "closedDate"],
+        }
+        rows = []
+        completed = False
+        try:
+            self._load(group_id, params, rows)
+            completed = True
+        finally:
+            self._store(rows)
+            if completed or rows:
+                new_low = since if completed else min(row[4] for row in rows)
+                self.conn.execute(
+                    "UPDATE sync_state SET low_water = ? WHERE group_id = ?",
+                    (new_low, group_id),
+                )
+                self.conn.commit()
+        return len(rows)
+
+    def _store(self, rows):
+        self.conn.executemany(
+            "INSERT OR REPLACE INTO tasks (id, group_id, responsible_id, title, closed_date)"
+            " VALUES (?, ?, ?, ?, ?)",
+            rows,
+        )
+        self.conn.commit()
+
+    def _save_state(self, group_id, low_water, high_water):
+        self.conn.execute(
+            "INSERT OR REPLACE INTO sync_state (group_id, high_water, low_water)"
+            " VALUES (?, ?, ?)",
+            (group_id, high_water, low_water),
+        )
+        self.conn.commit()
+
+    def sync(self, since, group_ids=None):
+        """
+        Синхронизирует все группы.
+        :param since: Дата, с которой в кэше должны быть все задачи групп
+        :param group_ids: ID групп (по умолчанию все группы из groups)
+        :return: Словарь {ID группы: None при успехе или текст ошибки}.
+            Прерванная синхронизация сохраняет загруженное, поэтому повтор
+            для группы с ошибкой продолжит с того же места.
+        """
+        status = {}
+        for group_id in group_ids or groups:
+            group_name = groups.get(group_id, group_id)
+            try:
+                loaded = self.sync_group(group_id, since)
+            except requests.exceptions.RequestException as e:
+                print(f"Ошибка при синхронизации группы {group_name}: {e}")
+                status[group_id] = str(e)
+                continue
+            except ValueError:
+                print(f"Ошибка обработки JSON для группы {group_name}")
+                status[group_id] = "Некорректный JSON в ответе"
+                continue
+            print(f"Группа {group_name}: загружено задач {loaded}")
+            status[group_id] = None
+        return status
+
+    def fetch_task_statistics_report(
+        self, start_date_api, end_date_api, group_ids=None
+    ):
+        """
+        Считает сокращенную статистику по локальному хранилищу.
+        :param group_ids: ID групп отчета (по умолчанию все группы из groups)
+        Считаем по ID ответственного, имена подставляются из справочника
+        при построении отчета, поэтому ошибка справочника не остается в кэше.
+        :return: {название группы: {ответственный: количество}}
+        """
+        rows = self.conn.execute(
+            """
+            SELECT group_id, responsible_id, COUNT(*)
+            FROM tasks
+            WHERE closed_date >= ? AND closed_date <= ?
+            GROUP BY group_id, responsible_id
+            """,
+            (start_date_api, end_date_api),
+        ).fetchall()
+
+        responsible_ids = {responsible_id for _, responsible_id, _ in rows}
+        try:
+            names = self.directory.resolve(responsible_ids)
+        except requests.exceptions.RequestException as e:
+            print(f"Ошибка при запросе пользователей: {e}")
+            names = {}
+        except ValueError:
+            print("Ошибка обработки JSON ответа user.get")
+            names = {}
+        names = disambiguate_names(
+            {
+                responsible_id: names.get(responsible_id, "Неизвестный")
+                for responsible_id in responsible_ids
+            }
+        )
+
+        selected = {group_id: groups[group_id] for group_id in group_ids or groups}
+        report_data = {group_name: {} for group_name in selected.values()}
+        for group_id, responsible_id, count in rows:
+            if group_id in selected:
+                report_data[groups[group_id]][names[responsible_id]] = count
+        return report_data
+
+
+def sync_with_retries(cache, since, client=None, group_ids=None):
+    """
+    Синхронизирует кэш и повторяет синхронизацию только для групп с ошибками.
+    Перед повтором ждет, пока размыкатель клиента снова пропустит запросы,
+    но не меньше экспоненциальной паузы.
+    :param client: B24Client, через который идет синхронизация (по умолчанию общий)
+    :param group_ids: ID групп (по умолчанию все группы из groups)
+    :return: Словарь {ID группы: текст ошибки} для групп, которые так и не загрузились
+    """
+    client = client or get_client()
+    for attempt in range(SYNC_ATTEMPTS):
+        if attempt:
+            delay = max(
+                client.breaker.retry_in(), SYNC_RETRY_DELAY * 2 ** (attempt - 1)
+            )
+            print(f"Повтор синхронизации групп {group_ids} через {delay:.0f} с")
+            time.sleep(delay)
+        status = cache.sync(since, group_ids)
+        group_ids = [group_id for group_id, error in status.items() if error]
+        if not group_ids:
+            return {}
+    return {group_id: status[group_id] for group_id in group_ids}
@@ -0,0 +1,224 @@
+"""
+Подробная выгрузка завершенных задач в CSV (с gzip) или Parquet.
+
+Задачи идут потоком прямо со страниц tasks.task.list: в памяти одновременно лежит
+одна страница ответа (для Parquet - одна группа строк), поэтому выгрузка за год
+по всем группам не требует держать все задачи в RAM.
+"""
+
+import csv
+import gzip
+import io
+import zlib
+
+import requests
+
+from src.b24request import (
+    build_task_list_params,
+    group_fetch_status,
+    groups,
+    iter_group_tasks,
+)
+from src.metrics import span
+from src.tg_upload import CHUNK_SIZE
+from src.user_directory import get_directory
+
+# Колонка выгрузки -> поле tasks.task.list (None - значение берется не из задачи)
+EXPORT_COLUMNS = {
+    "id": "id",
+    "group_id": None,
+    "group": None,
+    "title": "title",
+    "responsible_id": "responsibleId",
+    "responsible": "responsibleId",
+    "created_date": "createdDate",
+    "closed_date": "closedDate",
+    "deadline": "deadline",
+    "time_spent": "timeSpentInLogs",
+}
+DEFAULT_COLUMNS = ("id", "group", "responsible", "title", "closed_date")
+# Колонки, которые в Parquet хранятся числами
+INTEGER_COLUMNS = {"id", "group_id", "responsible_id", "time_spent"}
+CSV_COMPRESSIONS = (None, "gzip")
+PARQUET_COMPRESSIONS = ("snappy", "gzip", "zstd", "none")
+# Строк в одной группе строк Parquet: столько строк буферизуется перед записью
+ROW_GROUP_SIZE = 50000
+
+
+def parse_columns(value):
+    """
+    Разбирает список колонок через запятую и проверяет названия.
+    """
+    columns = tuple(column.strip() for column in value.split(",") if column.strip())
+    unknown = [column for column in columns if column not in EXPORT_COLUMNS]
+    if unknown or not columns:
+        raise ValueError(
+            f"Неизвестные колонки: {unknown}. Доступны: {', '.join(EXPORT_COLUMNS)}"
+        )
+    return columns
+
+
+def _select(columns):
+    return sorted(
+        {EXPORT_COLUMNS[column] for column in columns if EXPORT_COLUMNS[column]}
+    )
+
+
+def _responsible_name(directory, names, responsible_id):
+    """
+    Имя ответственного; справочник опрашивается один раз на каждого нового ID.
+    """
+    if responsible_id not in names:
+        try:
+            names.update(directory.resolve([responsible_id]))
+        except requests.exceptions.RequestException as e:
+            print(f"Ошибка при запросе пользователей: {e}")
+        except ValueError:
+            print("Ошибка обработки JSON ответа user.get")
+        names.setdefault(responsible_id, "Неизвестный")
+    return names[responsible_id]
+
+
+def iter_task_rows(
+    start_date_api,
+    end_date_api,
+    columns=DEFAULT_COLUMNS,
+    group_ids=None,
+    status=None,
+    group_map=None,
+    client=None,
+    directory=None,
+):
+    """
+    Постранично загружает задачи групп и отдает их строками (кортежами) в порядке columns.
+    :param status: Словарь, в который по ID группы записывается None при успехе
+        или текст ошибки. Строки группы, загруженные до ошибки, уже отданы (опционально)
+    :param group_map: Словарь {ID группы: название} вместо groups (опционально)
+    :param client: B24Client портала (по умолчанию общий клиент)
+    :param directory: UserDirectory портала (по умолчанию общий справочник)
+    """
+    group_map = group_map or groups
+    directory = directory or get_directory()
+    status = {} if status is None else status
+    select = _select(columns)
+    names = {}
+
+    for group_id in group_ids or group_map:
+        group_name = group_map[group_id]
+        params = build_task_list_params(group_id, start_date_api, end_date_api, select)
+        with group_fetch_status(status, group_id, group_name):
+            for task in iter_group_tasks(params, client=client):
+                row = []
+                for column in columns:
+                    if column == "group_id":
+                        row.append(group_id)
+                    elif column == "group":
+                        row.append(group_name)
+                    elif column == "responsible":
+                        responsible_id = int(task.get("responsibleId") or 0)
+                        row.append(_responsible_name(directory, names, responsible_id))
+                    else:
+                        row.append(task.get(EXPORT_COLUMNS[column]))
+                yield tuple(row)
+
+
+def iter_csv_bytes(rows, columns, compression=None, block_size=CHUNK_SIZE):
+    """
+    Отдает CSV с заголовком блоками байтов, например для TelegramAlert.send_file.
+    :param compression: None или "gzip"
+    :param block_size: Примерный размер несжатого блока
+    """
+    if compression not in CSV_COMPRESSIONS:
+        raise ValueError(f"Неподдерживаемое сжатие CSV: {compression}")
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+    # wbits=31 - формат gzip, совместимый с gzip.open и утилитой gunzip
+    compressor = zlib.compressobj(wbits=31) if compression == "gzip" else None
+
+    def take_block():
+        data = buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate()
+        return compressor.compress(data) if compressor else data
+
+    writer.writerow(columns)
+    with span("export", format="csv", rows=0) as attrs:
+        for row in rows:
+            writer.writerow(row)
+            attrs["rows"] += 1
+            if buffer.tell() >= block_size:
+                block = take_block()
+                if block:
+                    yield block
+    block = take_block()
+    if compressor:
+        block += compressor.flush()
+    yield block
+
+
+def export_csv(rows, columns, path, compression=None):
+    """
+    Пишет строки в CSV-файл по мере поступления.
+    :param compression: None или "gzip"
+    :return: Число записанных строк
+    """
+    if compression not in CSV_COMPRESSIONS:
+        raise ValueError(f"Неподдерживаемое сжатие CSV: {compression}")
+    opener = gzip.open if compression == "gzip" else open
+    count = 0
+    with opener(path, "wt", encoding="utf-8", newline="") as file:
+        writer = csv.writer(file, lineterminator="\n")
+        writer.writerow(columns)
+        with span("export", format="csv", rows=0) as attrs:
+            for row in rows:
+                writer.writerow(row)
+                count += 1
+            attrs["rows"] = count
+    return count
+
+
+def export_parquet(
+    rows, columns, path, compression="snappy", row_group_size=ROW_GROUP_SIZE
+):
+    """
+    Пишет строки в Parquet группами по row_group_size строк.
+    Требует pyarrow (pip install pyarrow).
+    :param compression: snappy, gzip, zstd или none
+    :return: Число записанных строк
+    """
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise RuntimeError("Для выгрузки в Parquet нужен pyarrow: pip install pyarrow")
+
+    if compression not in PARQUET_COMPRESSIONS:
+        raise ValueError(f"Неподдерживаемое сжатие Parquet: {compression}")
+    schema = pa.schema(
+        [
+            (column, pa.int64() if column in INTEGER_COLUMNS else pa.string())
+            for column in columns
+        ]
+    )
+
+    def to_value(column, value):
+        if value in (None, ""):
+            return None
+        return int(value) if column in INTEGER_COLUMNS else str(value)
+
+    count = 0
+    batch = {column: [] for column in columns}
+    with span("export", format="parquet", rows=0) as attrs:
+        with pq.ParquetWriter(path, schema, compression=compression) as writer:
+            for row in rows:
+                for column, value in zip(columns, row):
+                    batch[column].append(to_value(column, value))
+                count += 1
+                # Каждая группа строк пишется сразу и не держится в памяти
+                if count % row_group_size == 0:
+                    writer.write_table(pa.Table.from_pydict(batch, schema=schema))
+                    batch = {column: [] for column in columns}
+            if count % row_group_size:
+                writer.write_table(pa.Table.from_pydict(batch, schema=schema))
+        attrs["rows"] = count
+    return count
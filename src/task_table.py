@@ -0,0 +1,185 @@
+import calendar
+from array import array
+from collections import Counter
+from datetime import datetime, timezone
+
+from src.metrics import span
+
+
+class StringTable:
+    def __init__(self):
+        """
+        Таблица интернированных строк: каждая строка хранится один раз,
+        а в колонках лежат только ее индексы.
+        """
+        self.strings = []
+        self.index = {}
+
+    def intern(self, value):
+        """
+        Возвращает индекс строки, добавляя ее при первом появлении.
+        """
+        idx = self.index.get(value)
+        if idx is None:
+            idx = len(self.strings)
+            self.strings.append(value)
+            self.index[value] = idx
+        return idx
+
+    def __getitem__(self, idx):
+        return self.strings[idx]
+
+
+def parse_closed_date(closed_date):
+    """
+    Переводит closedDate из ответа API в секунды (время портала, без часового пояса).
+    """
+    if not closed_date:
+        return 0
+    parsed = datetime.strptime(closed_date[:19], "%Y-%m-%dT%H:%M:%S")
+    return calendar.timegm(parsed.timetuple())
+
+
+def format_closed_ts(closed_ts):
+    """
+    Обратное преобразование для parse_closed_date.
+    """
+    if not closed_ts:
+        return "Неизвестно"
+    return datetime.fromtimestamp(closed_ts, timezone.utc).strftime("%Y-%m-%dT%H:%M:%S")
+
+
+def disambiguate_names(name_by_id):
+    """
+    Возвращает имена для отчета по ID ответственного.
+    Однофамильцы различаются добавлением ID.
+    :param name_by_id: Словарь {ID ответственного: имя}
+    """
+    name_counts = Counter(name_by_id.values())
+    return {
+        responsible_id: name if name_counts[name] == 1 else f"{name} ({responsible_id})"
+        for responsible_id, name in name_by_id.items()
+    }
+
+
+class TaskTable:
+    def __init__(self):
+        """
+        Колоночное хранилище завершенных задач.
+        Числовые колонки лежат в array, имена и названия - в таблице строк.
+        """
+        self.group_id = array("l")
+        self.responsible_id = array("l")
+        self.closed_ts = array("q")
+        self.title_idx = array("l")
+        self.strings = StringTable()
+        # ID ответственного -> индекс имени в таблице строк
+        self.responsible_names = {}
+
+    def __len__(self):
+        return len(self.group_id)
+
+    def append(self, group_id, task):
+        """
+        Добавляет задачу из ответа tasks.task.list.
+        """
+        responsible_id = int(task.get("responsibleId") or 0)
+        # Имя берем из объекта responsible, если его выбрали в select
+        if responsible_id not in self.responsible_names and "responsible" in task:
+            self.responsible_names[responsible_id] = self.strings.intern(
+                task["responsible"].get("name", "Неизвестный")
+            )
+
+        self.group_id.append(group_id)
+        self.responsible_id.append(responsible_id)
+        self.closed_ts.append(parse_closed_date(task.get("closedDate")))
+        self.title_idx.append(self.strings.intern(task.get("title", "Без названия")))
+
+    def extend(self, group_id, tasks):
+        """
+        Добавляет задачи группы по мере их поступления.
+        """
+        for task in tasks:
+            self.append(group_id, task)
+
+    def merge(self, other):
+        """
+        Добавляет в таблицу все задачи другой TaskTable.
+        """
+        string_map = [self.strings.intern(value) for value in other.strings.strings]
+        self.group_id.extend(other.group_id)
+        self.responsible_id.extend(other.responsible_id)
+        self.closed_ts.extend(other.closed_ts)
+        self.title_idx.extend(string_map[idx] for idx in other.title_idx)
+        for responsible_id, name_idx in other.responsible_names.items():
+            self.responsible_names.setdefault(responsible_id, string_map[name_idx])
+
+    def add_names(self, names):
+        """
+        Добавляет имена ответственных, например из UserDirectory.
+        :param names: Словарь {ID ответственного: имя}
+        """
+        for responsible_id, name in names.items():
+            self.responsible_names[responsible_id] = self.strings.intern(name)
+
+    def count_by_group_responsible(self):
+        """
+        Считает задачи по паре (группа, ID ответственного).
+        """
+        return Counter(zip(self.group_id, self.responsible_id))
+
+    def count_by_group(self):
+        return Counter(self.group_id)
+
+    def responsible_name(self, responsible_id):
+        """
+        Имя ответственного без различения однофамильцев.
+        """
+        if responsible_id in self.responsible_names:
+            return self.strings[self.responsible_names[responsible_id]]
+        return "Неизвестный"
+
+    def display_names(self):
+        """
+        Возвращает имена для отчета по ID ответственного.
+        Однофамильцы различаются добавлением ID.
+        """
+        return disambiguate_names(
+            {
+                responsible_id: self.responsible_name(responsible_id)
+                for responsible_id in set(self.responsible_id)
+            }
+        )
+
+    def to_report(self, groups):
+        """
+        Формирует сокращенную статистику в формате fetch_task_statistics_report.
+        :param groups: Словарь {ID группы: название группы}
+        :return: {название группы: {ответственный: количество}}
+        """
+        with span("aggregate", tasks=len(self)):
+            names = self.display_names()
+            report_data = {group_name: {} for group_name in groups.values()}
+            for (
+                group_id,
+                responsible_id,
+            ), count in self.count_by_group_responsible().items():
+                if group_id in groups:
+                    report_data[groups[group_id]][names[responsible_id]] = count
+        return report_data
+
+    def iter_rows(self):
+        """
+        Отдает задачи, упорядоченные по группе и ответственному:
+        (ID группы, ID ответственного, дата закрытия, название).
+        """
+        order = sorted(
+            range(len(self)), key=lambda i: (self.group_id[i], self.responsible_id[i])
+        )
+        for i in order:
+            yield (
+                self.group_id[i],
+                self.responsible_id[i],
+                format_closed_ts(self.closed_ts[i]),
+                self.strings[self.title_idx[i]],
+            )
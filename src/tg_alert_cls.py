@@ -1,30 +1,284 @@
-import datetime
+import os
+import random
+import re
+import threading
 import time
+from collections import deque
 
-import requests
+from src.metrics import span
+from src.tg_upload import (
+    MAX_UPLOAD_SIZE,
+    MultipartFileBody,
+    content_type,
+    iter_multipart_chunks,
+    new_boundary,
+)
 
-from constants import B24REPORT_BOT, B24REPORT_CHAT_ID, B24REPORT_THREADS
+# Ограничения Bot API: ~30 сообщений в секунду всего, 20 в минуту в группу
+GLOBAL_LIMIT = (30, 1.0)
+GROUP_CHAT_LIMIT = (20, 60.0)
+PRIVATE_CHAT_LIMIT = (1, 1.0)
+MAX_RETRIES = 5
+TELEGRAM_API_URL = "https://api.telegram.org"
+# Максимальная длина текста одного сообщения
+MESSAGE_LIMIT = 4096
+PRE_OPEN = "<pre>\n"
+PRE_CLOSE = "</pre>\n"
+_TAG_RE = re.compile(r"<(/?)([a-zA-Z][\w-]*)[^>]*>")
+
+
+def _safe_cut(text, limit):
+    """
+    Возвращает позицию разреза не дальше limit, не попадая внутрь тега или сущности.
+    Если тег или сущность в начале текста длиннее limit, разрез ставится сразу
+    после них: часть выйдет длиннее, но останется корректным HTML.
+    """
+    cut = limit
+    tag_start = text.rfind("<", 0, cut)
+    if tag_start > text.rfind(">", 0, cut):
+        cut = tag_start
+    entity_start = text.rfind("&", 0, cut)
+    if entity_start > text.rfind(";", 0, cut):
+        cut = entity_start
+    # Предпочитаем резать по пробелу
+    space = text.rfind(" ", 0, cut)
+    if space > cut // 2:
+        cut = space + 1
+    if cut == 0:
+        cut = text.find(">" if text.startswith("<") else ";") + 1 or len(text)
+    return cut
+
+
+def _open_tags(text):
+    """
+    Возвращает незакрытые в text строчные теги (<b>, <i>, <a ...>) в порядке открытия:
+    [(имя, открывающий тег)]. <pre> не учитывается, его переносит iter_html_chunks.
+    """
+    stack = []
+    for match in _TAG_RE.finditer(text):
+        name = match.group(2).lower()
+        if name == "pre":
+            continue
+        if not match.group(1):
+            stack.append((name, match.group(0)))
+            continue
+        for i in range(len(stack) - 1, -1, -1):
+            if stack[i][0] == name:
+                del stack[i:]
+                break
+    return stack
+
+
+def _has_content(chunk):
+    """
+    Есть ли в части что-то кроме тегов <pre> и пробелов.
+    """
+    return bool("".join(chunk).replace("<pre>", "").replace("</pre>", "").strip())
+
+
+def iter_html_chunks(lines, limit=MESSAGE_LIMIT):
+    """
+    Собирает строки HTML-сообщения в части не длиннее limit символов.
+    Части разделяются по границам строк; если разрыв приходится внутрь <pre>,
+    блок закрывается в текущей части и открывается заново в следующей.
+    Строку длиннее limit режем, закрывая и заново открывая теги вроде <b>.
+    """
+    chunk = []
+    size = 0
+    in_pre = False
+    reserve = len(PRE_CLOSE)  # Место под закрывающий </pre>
+
+    for line in lines:
+        while size + len(line) + reserve > limit:
+            # Часть из одного открытого <pre> не отправляем, а дополняем куском строки
+            if _has_content(chunk):
+                text = "".join(chunk)
+                if in_pre and text.endswith(PRE_OPEN):
+                    # Блок только что открыт и пуст: он откроется в следующей части
+                    text = text[: -len(PRE_OPEN)]
+                elif in_pre:
+                    text += PRE_CLOSE
+                yield text
+                chunk = [PRE_OPEN] if in_pre else []
+                size = len(PRE_OPEN) if in_pre else 0
+                if size + len(line) + reserve <= limit:
+                    break
+            # Строка сама не помещается в часть: режем ее
+            budget = limit - size - reserve
+            cut = _safe_cut(line, budget)
+            while True:
+                open_tags = _open_tags(line[:cut])
+                closing = "".join(f"</{name}>" for name, _ in reversed(open_tags))
+                shorter = _safe_cut(line, cut - len(closing))
+                if cut + len(closing) <= budget or not 0 < shorter < cut:
+                    break
+                cut = shorter
+            chunk.append(line[:cut] + closing)
+            size += cut + len(closing)
+            line = "".join(tag for _, tag in open_tags) + line[cut:]
+
+        chunk.append(line)
+        size += len(line)
+        in_pre = line.count("<pre>") > line.count("</pre>") or (
+            in_pre and "</pre>" not in line
+        )
+
+    if _has_content(chunk):
+        yield "".join(chunk)
+
+
+class TelegramRateLimiter:
+    def __init__(self):
+        """
+        Ограничитель отправки в Telegram по скользящим окнам: общий и для каждого чата.
+        Если Telegram ответил 429, чат блокируется на retry_after секунд.
+        """
+        self.lock = threading.Lock()
+        self.global_sent = deque()
+        self.chat_sent = {}
+        self.chat_blocked_until = {}
+
+    @staticmethod
+    def _chat_limit(chat_id):
+        # ID групп и каналов в Telegram отрицательные
+        return GROUP_CHAT_LIMIT if str(chat_id).startswith("-") else PRIVATE_CHAT_LIMIT
+
+    @staticmethod
+    def _window_delay(sent, limit, now):
+        count, period = limit
+        while sent and now - sent[0] >= period:
+            sent.popleft()
+        if len(sent) < count:
+            return 0
+        return period - (now - sent[0])
+
+    def wait(self, chat_id):
+        """
+        Ждет, пока отправка в чат не нарушит ограничения, и резервирует слот.
+        """
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                chat_sent = self.chat_sent.setdefault(chat_id, deque())
+                delay = max(
+                    self._window_delay(self.global_sent, GLOBAL_LIMIT, now),
+                    self._window_delay(chat_sent, self._chat_limit(chat_id), now),
+                    self.chat_blocked_until.get(chat_id, 0) - now,
+                )
+                if delay <= 0:
+                    self.global_sent.append(now)
+                    chat_sent.append(now)
+                    return
+            time.sleep(delay)
+
+    def block(self, chat_id, seconds):
+        """
+        Блокирует отправку в чат после ответа 429.
+        """
+        with self.lock:
+            self.chat_blocked_until[chat_id] = time.monotonic() + seconds
+
+
+# Общий ограничитель для всех экземпляров TelegramAlert в процессе
+default_limiter = TelegramRateLimiter()
 
 
 class TelegramAlert:
-    def __init__(self, token, chat_id, threads=None):
+    def __init__(
+        self, token, chat_id, threads=None, limiter=None, api_url=TELEGRAM_API_URL
+    ):
         """
         Инициализация Telegram Bot
         :param token: Токен Telegram бота
         :param chat_id: ID группы или чата
         :param threads: Словарь с названиями тем и их ID
+        :param limiter: TelegramRateLimiter (по умолчанию общий для процесса)
+        :param api_url: Адрес Bot API (например, локальный сервер для тестов)
         """
         self.token = token
         self.chat_id = chat_id
         self.threads = threads or {}  # Словарь с темами
-        self.base_url = f"https://api.telegram.org/bot{self.token}/sendMessage"
+        self.api_url = f"{api_url}/bot{self.token}"
+        self.base_url = f"{self.api_url}/sendMessage"
+        # requests загружается при создании бота, а не при импорте модуля:
+        # нарезка сообщений нужна и без отправки
+        import requests
+
+        self.session = requests.Session()
+        self.limiter = limiter or default_limiter
+
+    def _request(self, method, params=None, data=None, headers=None):
+        """
+        Вызывает метод Bot API с учетом ограничений частоты.
+        На 429 ждет retry_after, на ошибки сети и 5xx повторяет с экспоненциальной паузой.
+        :param data: Тело запроса или функция, создающая его заново для каждой попытки.
+            Одноразовый итератор отправляется только один раз.
+        :return: Последний ответ или None, если ответа так и не было
+        """
+        import requests
+
+        response = None
+        with span("telegram_send", method=method, retries=0) as attrs:
+            for attempt in range(MAX_RETRIES):
+                if attempt and hasattr(data, "__next__"):
+                    # Поток уже прочитан, повторить отправку нечем
+                    break
+                attrs["retries"] = attempt
+                # После последней попытки ждать незачем
+                last_attempt = attempt == MAX_RETRIES - 1
+                self.limiter.wait(self.chat_id)
+                body = data() if callable(data) else data
+                try:
+                    response = self.session.post(
+                        f"{self.api_url}/{method}",
+                        params=params,
+                        data=body,
+                        headers=headers,
+                    )
+                except requests.exceptions.RequestException as e:
+                    print(f"Ошибка отправки в Telegram: {e}")
+                    if not last_attempt:
+                        time.sleep(2**attempt + random.random())
+                    continue
+                finally:
+                    if body is not data and hasattr(body, "close"):
+                        body.close()
+
+                if response.status_code == 429:
+                    try:
+                        retry_after = response.json()["parameters"]["retry_after"]
+                    except (ValueError, KeyError, TypeError):
+                        retry_after = 2**attempt
+                    self.limiter.block(self.chat_id, retry_after)
+                    continue
+                if response.status_code >= 500:
+                    if not last_attempt:
+                        time.sleep(2**attempt + random.random())
+                    continue
+                return response
+
+        return response
 
     def send_message(self, message, thread_name=None):
         """
-        Отправляет сообщение в телеграм
-        :param message: Текст сообщения
+        Отправляет сообщение в телеграм.
+        Слишком длинный текст делится на части по MESSAGE_LIMIT символов.
+        :param message: Текст сообщения или итератор уже нарезанных частей
         :param thread_name: Название темы (опционально)
+        :return: True, если отправлены все части
         """
+        if isinstance(message, str):
+            chunks = iter_html_chunks(message.splitlines(keepends=True))
+        else:
+            chunks = message
+
+        # Части отправляются строго по порядку; после ошибки остальные не шлем
+        for chunk in chunks:
+            if not self._send_text(chunk, thread_name):
+                return False
+        return True
+
+    def _send_text(self, message, thread_name=None):
         thread_id = self.threads.get(thread_name) if thread_name else None
         params = {
             "text": message,
@@ -33,13 +287,20 @@ class TelegramAlert:
             "parse_mode": "HTML",
         }
 
-        response = requests.get(self.base_url, params=params)
+        # Текст уходит в теле запроса, а не в URL
+        response = self._request("sendMessage", data=params)
+        if response is None:
+            print(
+                f"Ошибка: не удалось отправить сообщение в тему '{thread_name or 'общую'}'"
+            )
+            return False
         if response.status_code == 200:
-            print(f"Сообщение отправлено в тему '{thread_name or 'общую'}': {message}")
-        else:
-            print(f"Ошибка: {response.status_code} - {response.text}")
-
-        time.sleep(1)  # Задержка между запросами
+            print(
+                f"Сообщение отправлено в тему '{thread_name or 'общую'}' ({len(message)} символов)"
+            )
+            return True
+        print(f"Ошибка: {response.status_code} - {response.text}")
+        return False
 
     def send_pdf(self, file_path, thread_name=None, caption=None):
         """
@@ -48,35 +309,26 @@ class TelegramAlert:
         :param thread_name: Название темы (опционально)
         :param caption: Подпись к файлу (опционально)
         """
-        thread_id = self.threads.get(thread_name) if thread_name else None
-        params = {
-            "chat_id": self.chat_id,
-            "caption": caption,
-            "message_thread_id": thread_id,
-        }
-        with open(file_path, "rb") as file:
-            files = {"document": file}
-
-            response = requests.post(
-                f"https://api.telegram.org/bot{self.token}/sendDocument",
-                params=params,
-                files=files,
-            )
-        if response.status_code == 200:
-            print(f"Файл '{file_path}' отправлен в тему '{thread_name or 'общую'}'")
-        else:
-            print(f"Ошибка: {response.status_code} - {response.text}")
-            time.sleep(1)  # Задержка между запросами
+        return self.send_file(file_path, "document", thread_name, caption)
 
     def send_file(
-        self, file_path, file_type="document", thread_name=None, caption=None
+        self,
+        file_path,
+        file_type="document",
+        thread_name=None,
+        caption=None,
+        filename=None,
     ):
         """
-        Отправляет файл в телеграм
-        :param file_path: Путь к файлу
+        Отправляет файл в телеграм. Файл не загружается в память целиком:
+        с диска он читается частями, а поток байтов отправляется по мере генерации.
+        :param file_path: Путь к файлу, итератор частей (bytes или str) или функция,
+            возвращающая такой итератор (тогда отправку можно повторить)
         :param file_type: Тип файла ("document", "photo", "video", "audio")
         :param thread_name: Название темы (опционально)
         :param caption: Подпись к файлу (опционально)
+        :param filename: Имя файла в Telegram (обязательно, если передан не путь)
+        :raises ValueError: Неподдерживаемый тип или файл больше MAX_UPLOAD_SIZE
         """
         # Сопоставление типов файлов с методами API
         file_methods = {
@@ -100,24 +352,59 @@ class TelegramAlert:
         if thread_id:
             params["message_thread_id"] = thread_id
 
-        # Открытие файла и отправка
-        with open(file_path, "rb") as file:
-            files = {file_type: file}
-            time.sleep(1)  # Задержка между запросами
-            response = requests.post(
-                f"https://api.telegram.org/bot{self.token}/{file_methods[file_type]}",
-                params=params,
-                files=files,
-            )
-        if response.status_code == 200:
-            print(f"Файл '{file_path}' отправлен в тему '{thread_name or 'общую'}'")
+        boundary = new_boundary()
+        if isinstance(file_path, (str, os.PathLike)):
+            # Размер проверяем до отправки, чтобы не гнать по сети заведомо лишнее
+            size = os.path.getsize(file_path)
+            if size > MAX_UPLOAD_SIZE:
+                raise ValueError(
+                    f"Файл '{file_path}' ({size} байт) больше ограничения Bot API "
+                    f"в {MAX_UPLOAD_SIZE} байт"
+                )
+            filename = filename or os.path.basename(file_path)
+            path = file_path
+
+            def body():
+                return MultipartFileBody(path, file_type, filename, boundary)
+
         else:
+            if not filename:
+                raise ValueError("Для отправки потока нужно указать filename")
+            source = file_path
+
+            if callable(source):
+
+                def body():
+                    return iter_multipart_chunks(
+                        source(), file_type, filename, boundary
+                    )
+
+            else:
+                body = iter_multipart_chunks(source, file_type, filename, boundary)
+
+        response = self._request(
+            file_methods[file_type],
+            params=params,
+            data=body,
+            headers={"Content-Type": content_type(boundary)},
+        )
+        if response is not None and response.status_code == 200:
+            print(f"Файл '{filename}' отправлен в тему '{thread_name or 'общую'}'")
+            return True
+        if response is not None:
             print(f"Ошибка: {response.status_code} - {response.text}")
+        return False
 
 
 # Пример использования
 if __name__ == "__main__":
-    bot = TelegramAlert(B24REPORT_BOT, B24REPORT_CHAT_ID, B24REPORT_THREADS)
+    import constants
+
+    bot = TelegramAlert(
+        constants.B24REPORT_BOT,
+        constants.B24REPORT_CHAT_ID,
+        constants.B24REPORT_THREADS,
+    )
     # bot.send_message("Привет, это сообщение для всех!")  # Отправка в общую тему
     bot.send_message("rwwrwrg", thread_name="Раскрои ФРС")  # В тему "обсуждение"
     # bot.send_message("Сообщение об ошибке", thread_name="ошибки")  # В тему "ошибки"
@@ -0,0 +1,74 @@
+import queue
+import threading
+
+
+class TelegramSendQueue:
+    def __init__(self, alert):
+        """
+        Очередь исходящих сообщений Telegram с одним фоновым обработчиком.
+        Паузы между отправками выдерживает ограничитель TelegramAlert,
+        поэтому вызывающий код не ждет после каждого сообщения.
+        :param alert: Экземпляр TelegramAlert
+        """
+        self.alert = alert
+        self.queue = queue.Queue()
+        self.worker = threading.Thread(target=self._run, daemon=True)
+        self.worker.start()
+
+    def _run(self):
+        while True:
+            item = self.queue.get()
+            try:
+                if item is None:
+                    return
+                method, args, kwargs = item
+                try:
+                    method(*args, **kwargs)
+                except Exception as e:
+                    # Ошибка одного сообщения не должна останавливать очередь
+                    print(f"Ошибка при отправке из очереди: {e}")
+            finally:
+                self.queue.task_done()
+
+    def put_message(self, message, thread_name=None):
+        """
+        Ставит сообщение в очередь (параметры как у TelegramAlert.send_message).
+        """
+        self.queue.put((self.alert.send_message, (message, thread_name), {}))
+
+    def put_file(
+        self,
+        file_path,
+        file_type="document",
+        thread_name=None,
+        caption=None,
+        filename=None,
+    ):
+        """
+        Ставит файл в очередь (параметры как у TelegramAlert.send_file).
+        """
+        self.queue.put(
+            (
+                self.alert.send_file,
+                (file_path,),
+                {
+                    "file_type": file_type,
+                    "thread_name": thread_name,
+                    "caption": caption,
+                    "filename": filename,
+                },
+            )
+        )
+
+    def join(self):
+        """
+        Ждет, пока все поставленные сообщения будут отправлены.
+        """
+        self.queue.join()
+
+    def close(self):
+        """
+        Отправляет оставшиеся сообщения и останавливает обработчик.
+        """
+        self.queue.put(None)
+        self.worker.join()
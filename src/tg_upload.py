@@ -0,0 +1,93 @@
+import io
+import mimetypes
+import os
+import uuid
+
+# Ограничение Bot API на размер отправляемого файла
+MAX_UPLOAD_SIZE = 50 * 1024 * 1024
+CHUNK_SIZE = 64 * 1024
+
+
+def new_boundary():
+    return uuid.uuid4().hex
+
+
+def content_type(boundary):
+    return f"multipart/form-data; boundary={boundary}"
+
+
+def _part_prefix(boundary, field, filename):
+    mime_type = mimetypes.guess_type(filename)[0] or "application/octet-stream"
+    quoted = filename.replace('"', "%22")
+    return (
+        f"--{boundary}\r\n"
+        f'Content-Disposition: form-data; name="{field}"; filename="{quoted}"\r\n'
+        f"Content-Type: {mime_type}\r\n\r\n"
+    ).encode()
+
+
+def _part_suffix(boundary):
+    return f"\r\n--{boundary}--\r\n".encode()
+
+
+class MultipartFileBody:
+    def __init__(self, file_path, field, filename, boundary):
+        """
+        Тело multipart-запроса с одним файлом, которое читается с диска частями.
+        Длина известна заранее, поэтому запрос уходит с Content-Length.
+        :param file_path: Путь к файлу
+        :param field: Имя поля формы (document, photo, ...)
+        :param filename: Имя файла для получателя
+        :param boundary: Разделитель частей
+        """
+        prefix = _part_prefix(boundary, field, filename)
+        suffix = _part_suffix(boundary)
+        self.length = len(prefix) + os.path.getsize(file_path) + len(suffix)
+        self.parts = [io.BytesIO(prefix), open(file_path, "rb"), io.BytesIO(suffix)]
+        self.current = 0
+
+    def __len__(self):
+        return self.length
+
+    def read(self, size=-1):
+        if size is None or size < 0:
+            size = self.length
+        chunks = []
+        while size > 0 and self.current < len(self.parts):
+            chunk = self.parts[self.current].read(size)
+            if not chunk:
+                self.current += 1
+                continue
+            chunks.append(chunk)
+            size -= len(chunk)
+        return b"".join(chunks)
+
+    def __iter__(self):
+        while True:
+            chunk = self.read(CHUNK_SIZE)
+            if not chunk:
+                return
+            yield chunk
+
+    def close(self):
+        for part in self.parts:
+            part.close()
+
+
+def iter_multipart_chunks(chunks, field, filename, boundary, limit=MAX_UPLOAD_SIZE):
+    """
+    Оборачивает поток байтов (или строк) в multipart-тело без буферизации.
+    Длина заранее неизвестна, поэтому requests отправит его частями
+    (Transfer-Encoding: chunked).
+    :raises ValueError: Если поток превысил limit байт
+    """
+    yield _part_prefix(boundary, field, filename)
+    sent = 0
+    for chunk in chunks:
+        if isinstance(chunk, str):
+            chunk = chunk.encode("utf-8")
+        sent += len(chunk)
+        if sent > limit:
+            raise ValueError(f"Файл {filename} больше {limit // (1024 * 1024)} МБ")
+        yield chunk
+    yield _part_suffix(boundary)
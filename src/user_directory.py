@@ -0,0 +1,153 @@
+import json
+import os
+import threading
+import time
+
+import requests
+
+from src.b24batch import call_batch, fetch_lists_batched
+
+DEFAULT_DIRECTORY_PATH = "users_cache.json"
+DEFAULT_TTL = 24 * 60 * 60  # Сутки
+
+
+def _user_name(user):
+    name = f"{user.get('NAME') or ''} {user.get('LAST_NAME') or ''}".strip()
+    return name or f"ID {user.get('ID')}"
+
+
+class UserDirectory:
+    def __init__(self, path=DEFAULT_DIRECTORY_PATH, ttl=DEFAULT_TTL, client=None):
+        """
+        Справочник пользователей Bitrix24 с кэшем на диске
+        :param path: Путь к файлу кэша
+        :param ttl: Время жизни кэша в секундах
+        :param client: B24Client портала (по умолчанию общий клиент)
+        """
+        self.path = path
+        self.ttl = ttl
+        self.client = client
+        self.fetched_at = 0
+        self.names = {}  # ID пользователя -> "Имя Фамилия"
+        # ID, которых user.get не нашел: до следующего обновления их не запрашиваем
+        self.not_found = set()
+        self.lock = threading.Lock()
+        self._load()
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, encoding="utf-8") as file:
+                data = json.load(file)
+        except (OSError, ValueError):
+            print(f"Не удалось прочитать кэш пользователей {self.path}")
+            return
+        self.fetched_at = data.get("fetched_at", 0)
+        self.names = {
+            int(user_id): name for user_id, name in data.get("users", {}).items()
+        }
+        self.not_found = {int(user_id) for user_id in data.get("not_found", [])}
+
+    def _save(self):
+        with open(self.path, "w", encoding="utf-8") as file:
+            json.dump(
+                {
+                    "fetched_at": self.fetched_at,
+                    "users": self.names,
+                    "not_found": sorted(self.not_found),
+                },
+                file,
+                ensure_ascii=False,
+            )
+
+    def is_stale(self):
+        return time.time() - self.fetched_at > self.ttl
+
+    def refresh(self):
+        """
+        Загружает всех пользователей через user.get: первая страница дает total,
+        остальные страницы запрашиваются через batch.
+        """
+        users = fetch_lists_batched(
+            {"users": {"sort": "ID", "order": "ASC"}}, "user.get", client=self.client
+        )
+        self.names = {int(user["ID"]): _user_name(user) for user in users["users"]}
+        self.not_found = set()
+        self.fetched_at = time.time()
+        self._save()
+
+    def _fetch_missing(self, user_ids):
+        """
+        Дозагружает пользователей, появившихся после обновления кэша.
+        Ненайденные ID запоминаются, чтобы не запрашивать их при каждом отчете.
+        """
+        commands = {f"u{user_id}": f"user.get?ID={user_id}" for user_id in user_ids}
+        result = call_batch(commands, client=self.client)["result"]
+        for users in result.values():
+            for user in users or []:
+                self.names[int(user["ID"])] = _user_name(user)
+        self.not_found.update(
+            user_id for user_id in user_ids if user_id not in self.names
+        )
+        self._save()
+
+    def resolve(self, user_ids):
+        """
+        Возвращает имена пользователей по ID.
+        :param user_ids: Итерируемый набор ID
+        :return: Словарь {ID: "Имя Фамилия"} для найденных пользователей.
+            Если Bitrix24 недоступен, имена берутся из устаревшего кэша.
+        :raises requests.exceptions.RequestException: Bitrix24 недоступен, а кэш пуст
+        """
+        user_ids = set(user_ids)
+        # Справочник общий для потоков планировщика
+        with self.lock:
+            try:
+                if self.is_stale():
+                    self.refresh()
+
+                # responsibleId 0 - задача без ответственного, такого пользователя нет
+                missing = [
+                    user_id
+                    for user_id in user_ids
+                    if user_id > 0
+                    and user_id not in self.names
+                    and user_id not in self.not_found
+                ]
+                if missing:
+                    self._fetch_missing(missing)
+            except (requests.exceptions.RequestException, ValueError) as e:
+                if not self.names:
+                    raise
+                print(f"Справочник пользователей не обновлен, используем кэш: {e}")
+
+            return {
+                user_id: self.names[user_id]
+                for user_id in user_ids
+                if user_id in self.names
+            }
+
+    def fill_table(self, table):
+        """
+        Подставляет имена ответственных в TaskTable, загруженную без объекта responsible.
+        """
+        try:
+            table.add_names(self.resolve(table.responsible_id))
+        except requests.exceptions.RequestException as e:
+            print(f"Ошибка при запросе пользователей: {e}")
+        except ValueError:
+            print("Ошибка обработки JSON ответа user.get")
+
+
+_default_directory = None
+
+
+def get_directory():
+    """
+    Возвращает общий для процесса справочник, чтобы кэш оставался теплым между запусками.
+    """
+    global _default_directory
+    if _default_directory is None:
+        _default_directory = UserDirectory()
+    return _default_directory
@@ -0,0 +1,80 @@
+from urllib.parse import parse_qsl
+
+from src.b24batch import PAGE_SIZE, build_query, fetch_lists_batched
+
+
+class FakeBatchClient:
+    def __init__(self, totals, failing_starts=()):
+        """
+        Заглушка B24Client: отвечает на batch страницами tasks.task.list
+        :param totals: Словарь {ID группы: число задач}
+        :param failing_starts: Пары (ID группы, start), на которые возвращается ошибка
+        """
+        self.totals = totals
+        self.failing_starts = set(failing_starts)
+        self.batch_sizes = []
+
+    def call(self, method, params):
+        assert method == "batch"
+        commands = params["cmd"]
+        self.batch_sizes.append(len(commands))
+        result = {
+            "result": {},
+            "result_error": {},
+            "result_total": {},
+            "result_next": {},
+        }
+        for key, command in commands.items():
+            query = dict(parse_qsl(command.split("?", 1)[1]))
+            group_id = int(query["filter[GROUP_ID]"])
+            start = int(query.get("start", 0))
+            if (group_id, start) in self.failing_starts:
+                result["result_error"][key] = {"error": "INTERNAL_SERVER_ERROR"}
+                continue
+            total = self.totals[group_id]
+            result["result"][key] = {
+                "tasks": [
+                    {"id": str(i)} for i in range(start, min(start + PAGE_SIZE, total))
+                ]
+            }
+            result["result_total"][key] = total
+            if start + PAGE_SIZE < total:
+                result["result_next"][key] = start + PAGE_SIZE
+        return {"result": result}
+
+
+def _list_params(group_ids):
+    return {group_id: {"filter": {"GROUP_ID": group_id}} for group_id in group_ids}
+
+
+def test_build_query_flattens_nested_params():
+    query = build_query({"filter": {"GROUP_ID": 1}, "select": ["id", "title"]})
+
+    assert query == "filter%5BGROUP_ID%5D=1&select%5B0%5D=id&select%5B1%5D=title"
+
+
+def test_all_pages_are_fetched_in_order():
+    totals = {1: 0, 2: PAGE_SIZE, 3: PAGE_SIZE + 1, 4: 5000}
+    client = FakeBatchClient(totals)
+
+    items = fetch_lists_batched(
+        _list_params(totals), "tasks.task.list", "tasks", client=client
+    )
+
+    for group_id, total in totals.items():
+        assert [int(task["id"]) for task in items[group_id]] == list(range(total))
+    # Первые страницы одним batch, затем 1 + 99 оставшихся страниц двумя batch по 50
+    assert client.batch_sizes == [4, 50, 50]
+
+
+def test_failed_page_is_reported():
+    client = FakeBatchClient({1: 200, 2: 200}, failing_starts=[(2, 100)])
+    errors = {}
+
+    items = fetch_lists_batched(
+        _list_params([1, 2]), "tasks.task.list", "tasks", errors=errors, client=client
+    )
+
+    assert len(items[1]) == 200
+    assert list(errors) == [2]
+    assert len(items[2]) == 150
@@ -0,0 +1,118 @@
+import pytest
+import requests
+
+from src.b24client import B24Client, B24Error, CircuitOpenError
+
+URL = "https://portal.example/rest/1/token/tasks.task.list"
+
+
+class FakeResponse:
+    def __init__(self, status_code=200, data=None):
+        self.status_code = status_code
+        self.data = data
+        self.content = b"{}" if data is not None else b"<html>Bad Gateway</html>"
+
+    @property
+    def ok(self):
+        return self.status_code < 400
+
+    def json(self):
+        if self.data is None:
+            raise ValueError("not JSON")
+        return self.data
+
+    def raise_for_status(self):
+        if not self.ok:
+            raise requests.exceptions.HTTPError(
+                f"HTTP {self.status_code}", response=self
+            )
+
+
+class FakeSession:
+    def __init__(self, responses, on_post=None):
+        self.responses = list(responses)
+        self.on_post = on_post
+        self.posts = 0
+
+    def post(self, url, json=None, timeout=None):
+        self.posts += 1
+        if self.on_post:
+            self.on_post()
+        response = self.responses.pop(0)
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+
+def _client(responses, max_retries=3, on_post=None):
+    client = B24Client(URL, max_retries=max_retries)
+    client.session = FakeSession(responses, on_post)
+    client._sleep_before_retry = lambda attempt: None
+    return client
+
+
+def test_retryable_error_then_success():
+    client = _client(
+        [
+            FakeResponse(503, {"error": "QUERY_LIMIT_EXCEEDED"}),
+            FakeResponse(502),
+            FakeResponse(200, {"result": {"tasks": []}}),
+        ]
+    )
+
+    assert client.call("tasks.task.list") == {"result": {"tasks": []}}
+    assert client.session.posts == 3
+    assert client.breaker.failures == 0
+
+
+def test_failed_call_counts_once_for_breaker():
+    client = _client([requests.exceptions.ConnectionError("нет связи")] * 4)
+
+    with pytest.raises(requests.exceptions.ConnectionError):
+        client.call("tasks.task.list")
+    assert client.session.posts == 4
+    assert client.breaker.failures == 1
+    assert client.breaker.opened_at is None
+
+
+def test_non_retryable_error_is_raised_at_once():
+    client = _client([FakeResponse(401, {"error": "INVALID_CREDENTIALS"})])
+
+    with pytest.raises(B24Error) as error:
+        client.call("tasks.task.list")
+    assert error.value.code == "INVALID_CREDENTIALS"
+    assert client.session.posts == 1
+    assert client.breaker.failures == 0
+
+
+def test_open_breaker_rejects_calls_until_reset():
+    client = _client(
+        [FakeResponse(500, {"error": "INTERNAL_SERVER_ERROR"})] * 5
+        + [FakeResponse(200, {"result": 1})],
+        max_retries=0,
+    )
+    for _ in range(client.breaker.failure_threshold):
+        with pytest.raises(B24Error):
+            client.call("tasks.task.list")
+
+    with pytest.raises(CircuitOpenError):
+        client.call("tasks.task.list")
+    assert client.session.posts == 5
+    assert client.breaker.retry_in() > 0
+
+    # После reset_timeout пропускается пробный запрос
+    client.breaker.opened_at -= client.breaker.reset_timeout
+    assert client.call("tasks.task.list") == {"result": 1}
+    assert client.breaker.failures == 0
+
+
+def test_breaker_opened_during_retries_keeps_original_error():
+    client = _client([FakeResponse(500, {"error": "INTERNAL_SERVER_ERROR"})] * 4)
+    # Цепь размыкает другой поток, пока этот вызов повторяет запрос
+    client.session.on_post = client.breaker.record_failure
+    client.breaker.failure_threshold = 1
+
+    with pytest.raises(B24Error) as error:
+        client.call("tasks.task.list")
+    assert error.value.code == "INTERNAL_SERVER_ERROR"
+    assert client.session.posts == 1
@@ -0,0 +1,114 @@
+from urllib.parse import parse_qsl
+
+from src.b24request import OTHERS_NAME, fetch_task_statistics_report_counts
+
+GROUP_MAP = {1: "Первая", 2: "Вторая"}
+
+
+class FakeDirectory:
+    def __init__(self, names):
+        self.names = names
+
+    def resolve(self, user_ids):
+        return {
+            user_id: self.names[user_id]
+            for user_id in user_ids
+            if user_id in self.names
+        }
+
+
+class FakeCountsClient:
+    def __init__(self, members, tasks, failing=()):
+        """
+        Заглушка B24Client для batch со счетчиками задач
+        :param members: Словарь {ID группы: [ID участников]}
+        :param tasks: Словарь {ID группы: {ID ответственного: число задач}}
+        :param failing: Ключи команд, на которые возвращается ошибка
+        """
+        self.members = members
+        self.tasks = tasks
+        self.failing = set(failing)
+        self.commands = []
+
+    def call(self, method, params):
+        result = {
+            "result": {},
+            "result_error": {},
+            "result_total": {},
+            "result_next": {},
+        }
+        for key, command in params["cmd"].items():
+            self.commands.append(key)
+            if key in self.failing:
+                result["result_error"][key] = {"error": "ACCESS_DENIED"}
+                continue
+            command_method, query = command.split("?", 1)
+            query = dict(parse_qsl(query))
+            if command_method == "sonet_group.user.get":
+                group_members = self.members[int(query["ID"])]
+                result["result"][key] = [
+                    {"USER_ID": str(user_id)} for user_id in group_members
+                ]
+                continue
+            group_tasks = self.tasks[int(query["filter[GROUP_ID]"])]
+            if "filter[RESPONSIBLE_ID]" in query:
+                total = group_tasks.get(int(query["filter[RESPONSIBLE_ID]"]), 0)
+            else:
+                total = sum(group_tasks.values())
+            result["result"][key] = {"tasks": []}
+            result["result_total"][key] = total
+        return {"result": result}
+
+
+def _fetch(client, directory, status=None):
+    return fetch_task_statistics_report_counts(
+        "2025-01-01T00:00:00",
+        "2025-01-31T23:59:59",
+        status=status,
+        group_map=GROUP_MAP,
+        client=client,
+        directory=directory,
+    )
+
+
+def test_member_counts_and_others():
+    client = FakeCountsClient(
+        members={1: [10, 11, 12], 2: [10]},
+        tasks={1: {10: 3, 12: 2, 99: 4}, 2: {10: 1}},
+    )
+    directory = FakeDirectory({10: "Иванов", 11: "Петров", 12: "Сидоров"})
+
+    report = _fetch(client, directory)
+
+    # Задачи бывшего участника 99 попадают в строку "прочих"
+    assert report == {
+        "Первая": {"Иванов": 3, "Сидоров": 2, OTHERS_NAME: 4},
+        "Вторая": {"Иванов": 1},
+    }
+
+
+def test_namesakes_are_not_merged():
+    client = FakeCountsClient(
+        members={1: [10, 11], 2: []}, tasks={1: {10: 1, 11: 2}, 2: {}}
+    )
+    directory = FakeDirectory({10: "Иванов", 11: "Иванов"})
+
+    report = _fetch(client, directory)
+
+    assert report["Первая"] == {"Иванов (10)": 1, "Иванов (11)": 2}
+    assert report["Вторая"] == {}
+
+
+def test_group_with_failed_counter_is_left_out():
+    client = FakeCountsClient(
+        members={1: [10], 2: [10]},
+        tasks={1: {10: 3}, 2: {10: 1}},
+        failing=["g2_u10"],
+    )
+    status = {}
+
+    report = _fetch(client, FakeDirectory({10: "Иванов"}), status)
+
+    assert report == {"Первая": {"Иванов": 3}, "Вторая": {}}
+    assert status[1] is None
+    assert "ACCESS_DENIED" in status[2]
@@ -0,0 +1,112 @@
+from datetime import datetime
+
+import pytest
+import requests
+
+import src.b24request as b24request
+from src.periods import fetch_multi_period_report, last_months_ranges, period_range
+
+GROUP_MAP = {1: "Первая", 2: "Вторая"}
+PERIODS = {
+    "январь": ("2025-01-01T00:00:00", "2025-01-31T23:59:59"),
+    "февраль": ("2025-02-01T00:00:00", "2025-02-28T23:59:59"),
+    "квартал": ("2025-01-01T00:00:00", "2025-03-31T23:59:59"),
+}
+
+
+class FakeDirectory:
+    def __init__(self, names):
+        self.names = names
+
+    def fill_table(self, table):
+        table.add_names(self.names)
+
+
+def _task(responsible_id, closed_date):
+    return {"responsibleId": str(responsible_id), "closedDate": closed_date}
+
+
+@pytest.fixture
+def tasks_by_group(monkeypatch):
+    tasks_by_group = {}
+
+    def fake_iter_group_tasks(params, metrics=None, client=None):
+        tasks = tasks_by_group[params["filter"]["GROUP_ID"]]
+        if isinstance(tasks, Exception):
+            raise tasks
+        yield from tasks
+
+    monkeypatch.setattr(b24request, "iter_group_tasks", fake_iter_group_tasks)
+    return tasks_by_group
+
+
+def test_windows_are_sliced_by_closed_date(tasks_by_group):
+    tasks_by_group[1] = [
+        _task(1, "2025-01-01T00:00:00+03:00"),
+        _task(1, "2025-01-31T23:59:59+03:00"),
+        _task(2, "2025-02-01T00:00:00+03:00"),
+        _task(2, "2025-03-15T10:00:00+03:00"),
+    ]
+    tasks_by_group[2] = [_task(3, "2025-02-28T12:00:00+03:00")]
+    directory = FakeDirectory({1: "Иванов", 2: "Петров", 3: "Сидоров"})
+
+    reports = fetch_multi_period_report(
+        PERIODS, group_map=GROUP_MAP, directory=directory
+    )
+
+    assert reports["январь"] == {"Первая": {"Иванов": 2}, "Вторая": {}}
+    assert reports["февраль"] == {"Первая": {"Петров": 1}, "Вторая": {"Сидоров": 1}}
+    assert reports["квартал"] == {
+        "Первая": {"Иванов": 2, "Петров": 2},
+        "Вторая": {"Сидоров": 1},
+    }
+
+
+def test_namesakes_are_separated_per_window(tasks_by_group):
+    tasks_by_group[1] = [
+        _task(1, "2025-01-10T10:00:00"),
+        _task(2, "2025-02-10T10:00:00"),
+    ]
+    tasks_by_group[2] = []
+    directory = FakeDirectory({1: "Иванов", 2: "Иванов"})
+
+    reports = fetch_multi_period_report(
+        PERIODS, group_map=GROUP_MAP, directory=directory
+    )
+
+    # В одном окне однофамилец один, различать не с кем
+    assert reports["январь"]["Первая"] == {"Иванов": 1}
+    assert reports["квартал"]["Первая"] == {"Иванов (1)": 1, "Иванов (2)": 1}
+
+
+def test_failed_group_is_reported_and_left_out(tasks_by_group):
+    tasks_by_group[1] = [_task(1, "2025-01-10T10:00:00")]
+    tasks_by_group[2] = requests.exceptions.ConnectionError("обрыв соединения")
+    status = {}
+
+    reports = fetch_multi_period_report(
+        PERIODS,
+        status=status,
+        group_map=GROUP_MAP,
+        directory=FakeDirectory({1: "Иванов"}),
+    )
+
+    assert status == {1: None, 2: "обрыв соединения"}
+    assert reports["квартал"] == {"Первая": {"Иванов": 1}, "Вторая": {}}
+
+
+def test_period_ranges():
+    today = datetime(2025, 1, 15)
+
+    assert period_range("previous_month", today)[:2] == (
+        "2024-12-01T00:00:00",
+        "2024-12-31T23:59:59",
+    )
+    assert period_range("previous_quarter", today) == (
+        "2024-10-01T00:00:00",
+        "2024-12-31T23:59:59",
+        "4 кв. 2024",
+    )
+    assert list(last_months_ranges(3, today)) == ["10.2024", "11.2024", "12.2024"]
+    with pytest.raises(ValueError):
+        period_range("monthly", today)
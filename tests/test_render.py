@@ -0,0 +1,54 @@
+import csv
+import io
+import json
+
+from src.render import iter_report_lines, render_report, render_reports
+
+RESULTS = {
+    'Группа "А", склад': {"Иванов": 3, "Петров, ст.": 1},
+    "Пустая": {},
+}
+
+
+def test_csv_report_is_valid_csv():
+    report = render_report(RESULTS, "csv", "01.2025")
+
+    rows = list(csv.reader(io.StringIO(report)))
+    assert rows == [
+        ["report_month", "group", "responsible", "closed"],
+        ["01.2025", 'Группа "А", склад', "Иванов", "3"],
+        ["01.2025", 'Группа "А", склад', "Петров, ст.", "1"],
+    ]
+
+
+def test_json_report_round_trips():
+    report = render_report(RESULTS, "json", "01.2025")
+
+    assert json.loads(report) == {"report_month": "01.2025", "groups": RESULTS}
+
+
+def test_json_report_without_groups():
+    assert json.loads(render_report({}, "json", "01.2025"))["groups"] == {}
+
+
+def test_html_report_escapes_and_sorts():
+    report = render_report({"<A&B>": {"Петров": 1, "Иванов": 3}}, "html", "01.2025")
+
+    assert "🟢 <b>&lt;A&amp;B&gt;</b>" in report
+    assert report.index("Иванов") < report.index("Петров")
+    assert report.count("<pre>") == report.count("</pre>") == 1
+
+
+def test_lines_match_rendered_report():
+    for fmt in ("text", "html", "csv", "json"):
+        lines = list(iter_report_lines(RESULTS, fmt, "01.2025"))
+        assert "".join(lines) == render_report(RESULTS, fmt, "01.2025")
+
+
+def test_several_formats_in_one_pass():
+    outputs = {"csv": io.StringIO(), "json": io.StringIO()}
+
+    render_reports(RESULTS, outputs, "01.2025")
+
+    assert outputs["csv"].getvalue() == render_report(RESULTS, "csv", "01.2025")
+    assert json.loads(outputs["json"].getvalue())["groups"] == RESULTS
@@ -0,0 +1,146 @@
+import json
+from datetime import datetime
+
+import pytest
+
+import constants
+import src.scheduler as scheduler_module
+from src.metrics import recorder, span
+from src.scheduler import CronSchedule, ReportDefinition, ReportScheduler
+
+
+def test_fields_lists_ranges_and_steps():
+    schedule = CronSchedule("*/15 9-11 * * *")
+
+    assert schedule.minutes == {0, 15, 30, 45}
+    assert schedule.hours == {9, 10, 11}
+    assert schedule.matches(datetime(2025, 3, 4, 10, 30))
+    assert not schedule.matches(datetime(2025, 3, 4, 10, 31))
+    assert not schedule.matches(datetime(2025, 3, 4, 12, 0))
+
+
+def test_weekday_starts_on_sunday():
+    schedule = CronSchedule("0 9 * * 0")
+
+    assert schedule.matches(datetime(2025, 3, 2, 9, 0))  # воскресенье
+    assert not schedule.matches(datetime(2025, 3, 3, 9, 0))  # понедельник
+
+
+def test_restricted_day_and_weekday_match_either():
+    schedule = CronSchedule("0 9 1 * 1")
+
+    assert schedule.matches(datetime(2025, 3, 1, 9, 0))  # 1-е число, суббота
+    assert schedule.matches(datetime(2025, 3, 3, 9, 0))  # понедельник
+    assert not schedule.matches(datetime(2025, 3, 4, 9, 0))
+
+
+def test_unrestricted_weekday_keeps_day_of_month():
+    schedule = CronSchedule("0 9 1 * *")
+
+    assert schedule.matches(datetime(2025, 3, 1, 9, 0))
+    assert not schedule.matches(datetime(2025, 3, 3, 9, 0))
+
+
+@pytest.mark.parametrize(
+    "expression", ["0 9 * *", "60 9 * * *", "0 9 0 * *", "0 9 * 13 *"]
+)
+def test_invalid_expressions(expression):
+    with pytest.raises(ValueError):
+        CronSchedule(expression)
+
+
+def test_sunday_as_seven():
+    schedule = CronSchedule("0 9 * * 7")
+
+    assert schedule.weekdays == {0}
+    assert schedule.matches(datetime(2025, 3, 2, 9, 0))
+
+
+def _report(**config):
+    return {"name": "r", "schedule": "0 9 * * *", **config}
+
+
+@pytest.mark.parametrize(
+    "config", [{"period": "monthly"}, {"format": "xlsx"}, {"groups": [1]}]
+)
+def test_invalid_report_is_rejected_at_load(config):
+    with pytest.raises(ValueError):
+        ReportDefinition(_report(**config), {128: "ЗАМЕРЫ"})
+
+
+@pytest.fixture
+def scheduler(tmp_path, monkeypatch):
+    path = tmp_path / "reports.json"
+    path.write_text(
+        json.dumps(
+            {
+                "groups": {"1": "А", "2": "Б"},
+                "reports": [
+                    _report(name="месяц", groups=[1], period="previous_month"),
+                    _report(name="год", groups=[2], period="year_to_date"),
+                    _report(name="квартал", period="previous_quarter", format="csv"),
+                ],
+            }
+        ),
+        encoding="utf-8",
+    )
+    monkeypatch.setattr(constants, "B24REPORT_METRICS_PATH", None, raising=False)
+    scheduler = ReportScheduler(str(path))
+    scheduler.sent = []
+    scheduler.sender = FakeSender(scheduler.sent)
+    return scheduler
+
+
+class FakeSender:
+    def __init__(self, sent):
+        self.sent = sent
+
+    def put_message(self, message, thread_name=None):
+        self.sent.append(("message", "".join(message)))
+
+    def put_file(self, file_path, **kwargs):
+        self.sent.append(("file", kwargs["filename"], "".join(file_path())))
+
+    def join(self):
+        pass
+
+
+def test_overlapping_periods_share_one_fetch(scheduler, monkeypatch):
+    calls = []
+
+    def fake_fetch(periods, group_ids=None, status=None, group_map=None, **kwargs):
+        calls.append((sorted(periods), group_ids))
+        status.update({group_id: None for group_id in group_ids})
+        return {
+            window: {group_map[group_id]: {"Иванов": 1} for group_id in group_ids}
+            for window in periods
+        }
+
+    monkeypatch.setattr(scheduler_module, "fetch_multi_period_report", fake_fetch)
+
+    scheduler.run(scheduler.reports, datetime(2025, 5, 10))
+
+    # Прошлый месяц, прошлый квартал и начало года пересекаются: одна загрузка
+    assert calls == [
+        (
+            [
+                ("2025-01-01T00:00:00", "2025-03-31T23:59:59"),
+                ("2025-01-01T00:00:00", "2025-05-10T23:59:59"),
+                ("2025-04-01T00:00:00", "2025-04-30T23:59:59"),
+            ],
+            [1, 2],
+        )
+    ]
+    assert [item[0] for item in scheduler.sent] == ["message", "message", "file"]
+
+
+def test_metrics_are_cleared_after_each_run(scheduler, monkeypatch):
+    def failing_run(reports, today=None):
+        with span("fetch"):
+            raise ValueError("ошибка загрузки")
+
+    monkeypatch.setattr(scheduler, "run", failing_run)
+
+    scheduler._run_scheduled(scheduler.reports, datetime(2025, 5, 10))
+
+    assert recorder.spans == []
@@ -0,0 +1,153 @@
+import pytest
+import requests
+
+import src.task_cache as task_cache
+from src.b24request import groups
+from src.task_cache import TaskCache
+
+GROUP_ID = 128
+GROUP_NAME = groups[GROUP_ID]
+
+
+class FakeDirectory:
+    def __init__(self, names):
+        self.names = names
+
+    def resolve(self, user_ids):
+        return {
+            user_id: self.names[user_id]
+            for user_id in user_ids
+            if user_id in self.names
+        }
+
+
+class FakeTasks:
+    def __init__(self, tasks):
+        """
+        Заглушка iter_group_tasks, которая учитывает фильтры и порядок по CLOSED_DATE.
+        :param tasks: Список задач {"id", "group", "responsibleId", "closedDate"}
+        """
+        self.tasks = tasks
+        self.fail_after = None
+        self.requests = []
+
+    def __call__(self, params, metrics=None, client=None):
+        task_filter = params["filter"]
+        self.requests.append(task_filter)
+        # Фильтры Bitrix24 сравнивают даты во времени портала, без часового пояса
+        selected = [
+            task
+            for task in self.tasks
+            if task["group"] == task_filter["GROUP_ID"]
+            and task["closedDate"][:19] > task_filter.get(">CLOSED_DATE", "")
+            and task["closedDate"][:19] >= task_filter.get(">=CLOSED_DATE", "")
+            and task["closedDate"][:19] <= task_filter.get("<=CLOSED_DATE", "9999")
+        ]
+        reverse = params["order"]["CLOSED_DATE"] == "DESC"
+        for i, task in enumerate(
+            sorted(selected, key=lambda t: t["closedDate"], reverse=reverse)
+        ):
+            if self.fail_after is not None and i == self.fail_after:
+                raise requests.exceptions.ConnectionError("обрыв соединения")
+            yield task
+
+
+def _task(task_id, closed_date, responsible_id=1, group_id=GROUP_ID):
+    return {
+        "id": str(task_id),
+        "group": group_id,
+        "title": f"Задача {task_id}",
+        "responsibleId": str(responsible_id),
+        "closedDate": f"{closed_date}T12:00:00+03:00",
+    }
+
+
+@pytest.fixture
+def fake_tasks(monkeypatch):
+    fake = FakeTasks([])
+    monkeypatch.setattr(task_cache, "iter_group_tasks", fake)
+    return fake
+
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = TaskCache(
+        str(tmp_path / "cache.sqlite3"), directory=FakeDirectory({1: "Иванов"})
+    )
+    yield cache
+    cache.close()
+
+
+def _count(cache, start, end):
+    report = cache.fetch_task_statistics_report(f"{start}T00:00:00", f"{end}T23:59:59")
+    return sum(report[GROUP_NAME].values())
+
+
+def test_incremental_sync_loads_only_new_tasks(cache, fake_tasks):
+    fake_tasks.tasks = [_task(i, f"2025-02-{i:02}") for i in range(1, 11)]
+    assert cache.sync_group(GROUP_ID, "2025-01-01T00:00:00") == 10
+
+    fake_tasks.tasks.append(_task(11, "2025-02-20"))
+    assert cache.sync_group(GROUP_ID, "2025-01-01T00:00:00") == 1
+    assert fake_tasks.requests[-1][">CLOSED_DATE"] == "2025-02-10T12:00:00"
+    assert _count(cache, "2025-02-01", "2025-02-28") == 11
+
+
+def test_earlier_period_is_backfilled(cache, fake_tasks):
+    fake_tasks.tasks = [_task(i, f"2025-01-{i:02}") for i in range(1, 21)]
+    cache.sync_group(GROUP_ID, "2025-01-15T00:00:00")
+    assert _count(cache, "2025-01-01", "2025-01-31") == 6
+
+    assert cache.sync_group(GROUP_ID, "2025-01-01T00:00:00") == 14
+    assert cache.coverage(GROUP_ID)[0] == "2025-01-01T00:00:00"
+    assert _count(cache, "2025-01-01", "2025-01-31") == 20
+
+
+def test_interrupted_sync_keeps_loaded_tasks(cache, fake_tasks):
+    fake_tasks.tasks = [_task(i, f"2025-03-{i:02}") for i in range(1, 11)]
+    fake_tasks.fail_after = 4
+
+    status = cache.sync("2025-03-01T00:00:00", [GROUP_ID])
+    assert status[GROUP_ID]
+    assert _count(cache, "2025-03-01", "2025-03-31") == 4
+
+    fake_tasks.fail_after = None
+    assert cache.sync("2025-03-01T00:00:00", [GROUP_ID]) == {GROUP_ID: None}
+    assert _count(cache, "2025-03-01", "2025-03-31") == 10
+
+
+def test_namesakes_are_counted_separately(tmp_path, fake_tasks):
+    directory = FakeDirectory({1: "Петров", 2: "Петров", 3: "Сидоров"})
+    cache = TaskCache(str(tmp_path / "cache.sqlite3"), directory=directory)
+    fake_tasks.tasks = [
+        _task(1, "2025-04-01", 1),
+        _task(2, "2025-04-02", 2),
+        _task(3, "2025-04-03", 2),
+        _task(4, "2025-04-04", 3),
+    ]
+    try:
+        cache.sync("2025-04-01T00:00:00", [GROUP_ID])
+        report = cache.fetch_task_statistics_report(
+            "2025-04-01T00:00:00", "2025-04-30T23:59:59"
+        )
+    finally:
+        cache.close()
+
+    assert report[GROUP_NAME] == {"Петров (1)": 1, "Петров (2)": 2, "Сидоров": 1}
+
+
+def test_sync_with_retries_loads_only_selected_groups(cache, fake_tasks):
+    fake_tasks.tasks = [_task(1, "2025-05-01"), _task(2, "2025-05-02", group_id=0)]
+
+    status = task_cache.sync_with_retries(
+        cache, "2025-05-01T00:00:00", group_ids=[GROUP_ID]
+    )
+    assert status == {}
+    assert {task_filter["GROUP_ID"] for task_filter in fake_tasks.requests} == {
+        GROUP_ID
+    }
+
+    report = cache.fetch_task_statistics_report(
+        "2025-05-01T00:00:00", "2025-05-31T23:59:59", group_ids=[GROUP_ID]
+    )
+    assert report == {GROUP_NAME: {"Иванов": 1}}
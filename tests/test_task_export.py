@@ -0,0 +1,153 @@
+import csv
+import gzip
+import io
+
+import pytest
+import requests
+
+import src.task_export as task_export
+from src.b24request import groups
+from src.task_export import (
+    export_csv,
+    export_parquet,
+    iter_csv_bytes,
+    iter_task_rows,
+    parse_columns,
+)
+
+GROUP_IDS = list(groups)[:2]
+
+
+class FakeDirectory:
+    def __init__(self, names):
+        self.names = names
+        self.calls = []
+
+    def resolve(self, user_ids):
+        self.calls.append(list(user_ids))
+        return {
+            user_id: self.names[user_id]
+            for user_id in user_ids
+            if user_id in self.names
+        }
+
+
+def _task(task_id, responsible_id):
+    return {
+        "id": str(task_id),
+        "title": f"Задача {task_id}",
+        "responsibleId": str(responsible_id),
+        "closedDate": "2025-01-10T12:00:00+03:00",
+    }
+
+
+@pytest.fixture
+def fake_tasks(monkeypatch):
+    tasks = {GROUP_IDS[0]: [_task(1, 1), _task(2, 2)], GROUP_IDS[1]: [_task(3, 1)]}
+    failing = set()
+
+    def iter_group_tasks(params, metrics=None, client=None):
+        group_id = params["filter"]["GROUP_ID"]
+        yield from tasks[group_id]
+        if group_id in failing:
+            raise requests.exceptions.ConnectionError("обрыв соединения")
+
+    monkeypatch.setattr(task_export, "iter_group_tasks", iter_group_tasks)
+    return failing
+
+
+def test_parse_columns_rejects_unknown_and_empty():
+    assert parse_columns(" id, group ,title") == ("id", "group", "title")
+    with pytest.raises(ValueError):
+        parse_columns("id,unknown")
+    with pytest.raises(ValueError):
+        parse_columns(" , ")
+
+
+def test_rows_follow_columns_and_resolve_each_user_once(fake_tasks):
+    directory = FakeDirectory({1: "Иванов"})
+    rows = list(
+        iter_task_rows(
+            "2025-01-01T00:00:00",
+            "2025-01-31T23:59:59",
+            ("id", "group_id", "group", "responsible"),
+            group_ids=GROUP_IDS,
+            directory=directory,
+        )
+    )
+
+    assert rows == [
+        ("1", GROUP_IDS[0], groups[GROUP_IDS[0]], "Иванов"),
+        ("2", GROUP_IDS[0], groups[GROUP_IDS[0]], "Неизвестный"),
+        ("3", GROUP_IDS[1], groups[GROUP_IDS[1]], "Иванов"),
+    ]
+    assert directory.calls == [[1], [2]]
+
+
+def test_failed_group_is_recorded_and_others_continue(fake_tasks):
+    fake_tasks.add(GROUP_IDS[0])
+    status = {}
+    rows = list(
+        iter_task_rows(
+            "2025-01-01T00:00:00",
+            "2025-01-31T23:59:59",
+            ("id",),
+            group_ids=GROUP_IDS,
+            status=status,
+            directory=FakeDirectory({}),
+        )
+    )
+
+    assert rows == [("1",), ("2",), ("3",)]
+    assert status[GROUP_IDS[0]]
+    assert status[GROUP_IDS[1]] is None
+
+
+ROWS = [(str(i), f"Задача, {i}") for i in range(100)]
+COLUMNS = ("id", "title")
+
+
+@pytest.mark.parametrize("compression", [None, "gzip"])
+def test_csv_blocks_join_into_one_file(compression):
+    blocks = list(iter_csv_bytes(iter(ROWS), COLUMNS, compression, block_size=256))
+    assert len(blocks) > 1
+
+    data = b"".join(blocks)
+    if compression:
+        data = gzip.decompress(data)
+    assert list(csv.reader(io.StringIO(data.decode("utf-8")))) == [list(COLUMNS)] + [
+        list(row) for row in ROWS
+    ]
+
+
+def test_export_csv_gzip(tmp_path):
+    path = tmp_path / "tasks.csv.gz"
+    assert export_csv(iter(ROWS), COLUMNS, path, "gzip") == len(ROWS)
+
+    with gzip.open(path, "rt", encoding="utf-8", newline="") as file:
+        assert list(csv.reader(file))[1:] == [list(row) for row in ROWS]
+
+
+def test_unknown_compression_is_rejected(tmp_path):
+    with pytest.raises(ValueError):
+        next(iter_csv_bytes(iter(ROWS), COLUMNS, "bz2"))
+    with pytest.raises(ValueError):
+        export_csv(iter(ROWS), COLUMNS, tmp_path / "tasks.csv", "bz2")
+
+
+def test_export_parquet_writes_row_groups(tmp_path):
+    pq = pytest.importorskip("pyarrow.parquet")
+    path = tmp_path / "tasks.parquet"
+    rows = [("1", "Задача", ""), ("2", None, "60")]
+
+    count = export_parquet(
+        iter(rows), ("id", "title", "time_spent"), path, row_group_size=1
+    )
+
+    assert count == 2
+    parquet = pq.ParquetFile(path)
+    assert parquet.metadata.num_row_groups == 2
+    assert parquet.read().to_pylist() == [
+        {"id": 1, "title": "Задача", "time_spent": None},
+        {"id": 2, "title": None, "time_spent": 60},
+    ]
@@ -0,0 +1,208 @@
+import pytest
+import requests
+
+import src.tg_alert_cls as tg_alert_cls
+from src.b24request import iter_html_report_chunks
+from src.tg_alert_cls import (
+    GROUP_CHAT_LIMIT,
+    MAX_RETRIES,
+    PRE_CLOSE,
+    PRE_OPEN,
+    TelegramAlert,
+    TelegramRateLimiter,
+    _safe_cut,
+    iter_html_chunks,
+)
+from src.tg_queue import TelegramSendQueue
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+        self.sleeps = []
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+class FakeResponse:
+    def __init__(self, status_code, data=None):
+        self.status_code = status_code
+        self.data = data or {}
+        self.text = str(self.data)
+
+    def json(self):
+        return self.data
+
+
+class FakeSession:
+    def __init__(self, responses):
+        """
+        :param responses: Ответы по порядку; исключение бросается вместо ответа
+        """
+        self.responses = list(responses)
+        self.posts = []
+
+    def post(self, url, params=None, data=None, headers=None):
+        self.posts.append((url, data))
+        response = self.responses.pop(0)
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(tg_alert_cls.time, "monotonic", clock.monotonic)
+    monkeypatch.setattr(tg_alert_cls.time, "sleep", clock.sleep)
+    return clock
+
+
+def _alert(responses, chat_id="-100"):
+    alert = TelegramAlert("token", chat_id, limiter=TelegramRateLimiter())
+    alert.session = FakeSession(responses)
+    return alert
+
+
+def test_group_chat_window(clock):
+    limiter = TelegramRateLimiter()
+    count, period = GROUP_CHAT_LIMIT
+
+    for _ in range(count):
+        limiter.wait("-100")
+    assert clock.sleeps == []
+
+    limiter.wait("-100")
+    assert clock.sleeps == [period]
+
+
+def test_private_chat_is_limited_separately(clock):
+    limiter = TelegramRateLimiter()
+
+    limiter.wait("1")
+    limiter.wait("2")
+    assert clock.sleeps == []
+    limiter.wait("1")
+    assert clock.sleeps == [1.0]
+
+
+def test_block_delays_only_that_chat(clock):
+    limiter = TelegramRateLimiter()
+    limiter.block("-100", 30)
+
+    limiter.wait("-200")
+    assert clock.sleeps == []
+    limiter.wait("-100")
+    assert clock.sleeps == [30]
+
+
+def test_retry_after_from_429_is_respected(clock):
+    alert = _alert(
+        [
+            FakeResponse(429, {"parameters": {"retry_after": 7}}),
+            FakeResponse(200, {"ok": True}),
+        ]
+    )
+
+    assert alert.send_message("Отчет")
+    assert len(alert.session.posts) == 2
+    assert clock.sleeps == [7]
+
+
+def test_no_sleep_after_last_attempt(clock):
+    alert = _alert([FakeResponse(502)] * MAX_RETRIES)
+
+    assert not alert.send_message("Отчет")
+    assert len(alert.session.posts) == MAX_RETRIES
+    # Паузы только между попытками
+    assert len(clock.sleeps) == MAX_RETRIES - 1
+
+
+def test_network_error_is_retried(clock):
+    alert = _alert(
+        [requests.exceptions.ConnectionError("нет связи"), FakeResponse(200)]
+    )
+
+    assert alert.send_message("Отчет")
+    assert len(alert.session.posts) == 2
+
+
+def test_queue_sends_in_order(clock):
+    alert = _alert([FakeResponse(200)] * 3)
+    sender = TelegramSendQueue(alert)
+
+    for text in ("первое", "второе", "третье"):
+        sender.put_message(text)
+    sender.close()
+
+    assert [data["text"] for _, data in alert.session.posts] == [
+        "первое",
+        "второе",
+        "третье",
+    ]
+
+
+def _text(chunks):
+    # Содержимое без служебных тегов <pre>, которые добавляются на разрывах
+    return "".join(chunks).replace(PRE_OPEN, "").replace(PRE_CLOSE, "")
+
+
+def test_short_message_is_one_chunk():
+    lines = ["<b>Отчет</b>\n", PRE_OPEN, "Иванов 10\n", PRE_CLOSE]
+    assert list(iter_html_chunks(lines, 100)) == ["".join(lines)]
+
+
+def test_pre_is_closed_and_reopened_across_chunks():
+    lines = ["<b>Отчет</b>\n", PRE_OPEN] + [f"Сотрудник {i:03} 10\n" for i in range(30)]
+    lines.append(PRE_CLOSE)
+    chunks = list(iter_html_chunks(lines, 120))
+
+    assert len(chunks) > 1
+    for chunk in chunks:
+        assert len(chunk) <= 120
+        assert chunk.count("<pre>") == chunk.count("</pre>")
+    assert _text(chunks) == _text(lines)
+
+
+def test_long_line_inside_pre_does_not_produce_empty_chunks():
+    lines = ["<b>Отчет</b>\n", PRE_OPEN, "a" * 250 + "\n", "b\n", PRE_CLOSE]
+    chunks = list(iter_html_chunks(lines, 100))
+
+    for chunk in chunks:
+        assert len(chunk) <= 100
+        assert _text([chunk]).strip()
+        assert chunk.count("<pre>") == chunk.count("</pre>")
+    assert _text(chunks) == _text(lines)
+
+
+def test_cut_does_not_split_entities():
+    lines = [("x&amp;" * 40) + "\n"]
+    chunks = list(iter_html_chunks(lines, 50))
+
+    assert "".join(chunks) == lines[0]
+    for chunk in chunks:
+        assert chunk.count("&") == chunk.count(";")
+
+
+def test_long_bold_line_is_closed_and_reopened():
+    chunks = list(iter_html_report_chunks({"Г" * 300: {"Иванов": 3}}, limit=100))
+
+    assert len(chunks) > 2
+    for chunk in chunks:
+        assert len(chunk) <= 100
+        assert chunk.count("<b>") == chunk.count("</b>")
+        assert chunk.count("<pre>") == chunk.count("</pre>")
+    assert "".join(chunks).replace("</b><b>", "").count("Г") == 300
+
+
+def test_safe_cut_never_lands_inside_a_leading_tag():
+    text = '<a href="https://example.com/very/long">ссылка</a>'
+
+    assert _safe_cut(text, 5) == text.index(">") + 1
+    assert _safe_cut("&amp;x", 3) == 5
+    assert _safe_cut("abc <b>def</b>", 6) == 4
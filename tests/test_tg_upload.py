@@ -0,0 +1,68 @@
+import pytest
+
+from src.tg_queue import TelegramSendQueue
+from src.tg_upload import CHUNK_SIZE, MultipartFileBody, iter_multipart_chunks
+
+
+def test_body_matches_streamed_multipart(tmp_path):
+    path = tmp_path / "report.csv"
+    content = bytes(range(256)) * (CHUNK_SIZE // 64)
+    path.write_bytes(content)
+
+    body = MultipartFileBody(str(path), "document", "report.csv", "boundary")
+    try:
+        data = b"".join(body)
+    finally:
+        body.close()
+
+    expected = b"".join(
+        iter_multipart_chunks([content], "document", "report.csv", "boundary")
+    )
+    assert data == expected
+    assert len(body) == len(data)
+    assert b'name="document"; filename="report.csv"' in data
+    assert data.endswith(b"\r\n--boundary--\r\n")
+
+
+def test_read_in_small_parts(tmp_path):
+    path = tmp_path / "report.txt"
+    path.write_bytes(b"x" * 1000)
+
+    body = MultipartFileBody(str(path), "document", "report.txt", "boundary")
+    parts = []
+    while True:
+        part = body.read(7)
+        if not part:
+            break
+        assert len(part) <= 7
+        parts.append(part)
+    body.close()
+
+    assert len(b"".join(parts)) == len(body)
+    assert body.parts[1].closed
+
+
+def test_stream_over_limit_is_rejected():
+    chunks = iter_multipart_chunks(
+        ["x" * 10, "y" * 10], "document", "report.csv", "boundary", limit=15
+    )
+
+    with pytest.raises(ValueError):
+        b"".join(chunks)
+
+
+def test_queued_file_keeps_filename():
+    class FakeAlert:
+        def __init__(self):
+            self.files = []
+
+        def send_file(self, file_path, **kwargs):
+            self.files.append((file_path, kwargs))
+
+    alert = FakeAlert()
+    sender = TelegramSendQueue(alert)
+    sender.put_file("/tmp/report.bin", caption="Отчет", filename="report.csv")
+    sender.close()
+
+    assert alert.files[0][1]["filename"] == "report.csv"
+    assert alert.files[0][1]["caption"] == "Отчет"
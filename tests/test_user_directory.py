@@ -0,0 +1,86 @@
+import json
+import time
+from urllib.parse import parse_qsl
+
+import pytest
+import requests
+
+from src.task_table import TaskTable
+from src.user_directory import UserDirectory
+
+
+class FakeClient:
+    def __init__(self, users=None, error=None):
+        """
+        Заглушка B24Client для user.get через batch
+        :param users: Словарь {ID: (имя, фамилия)}
+        :param error: Исключение, которое бросает каждый вызов
+        """
+        self.users = users or {}
+        self.error = error
+        self.calls = []
+
+    def call(self, method, params):
+        self.calls.append(params["cmd"])
+        if self.error:
+            raise self.error
+        result = {}
+        for key, command in params["cmd"].items():
+            query = dict(parse_qsl(command.split("?", 1)[1]))
+            user_ids = [int(query["ID"])] if "ID" in query else sorted(self.users)
+            result[key] = [
+                {"ID": str(user_id), "NAME": name, "LAST_NAME": last_name}
+                for user_id in user_ids
+                if user_id in self.users
+                for name, last_name in [self.users[user_id]]
+            ]
+        return {"result": {"result": result}}
+
+
+def _write_cache(path, users, age):
+    with open(path, "w", encoding="utf-8") as file:
+        json.dump({"fetched_at": time.time() - age, "users": users}, file)
+
+
+def test_stale_cache_is_used_when_refresh_fails(tmp_path):
+    path = str(tmp_path / "users.json")
+    _write_cache(path, {"5": "Иван Петров"}, age=10 * 24 * 60 * 60)
+    client = FakeClient(error=requests.exceptions.ConnectionError("нет связи"))
+    directory = UserDirectory(path, client=client)
+
+    table = TaskTable()
+    table.extend(1, [{"responsibleId": "5"}])
+    directory.fill_table(table)
+
+    assert table.to_report({1: "g"}) == {"g": {"Иван Петров": 1}}
+
+
+def test_refresh_error_is_raised_without_cache(tmp_path):
+    client = FakeClient(error=requests.exceptions.ConnectionError("нет связи"))
+    directory = UserDirectory(str(tmp_path / "users.json"), client=client)
+
+    with pytest.raises(requests.exceptions.ConnectionError):
+        directory.resolve([5])
+
+
+def test_refresh_loads_all_users(tmp_path):
+    client = FakeClient({1: ("Иван", "Петров"), 2: ("Анна", "")})
+    directory = UserDirectory(str(tmp_path / "users.json"), client=client)
+
+    assert directory.resolve([1, 2]) == {1: "Иван Петров", 2: "Анна"}
+    assert len(client.calls) == 1
+
+
+def test_unknown_users_are_not_requested_again(tmp_path):
+    path = str(tmp_path / "users.json")
+    _write_cache(path, {"5": "Иван Петров"}, age=0)
+    client = FakeClient({5: ("Иван", "Петров")})
+    directory = UserDirectory(path, client=client)
+
+    assert directory.resolve([0, 5, 7]) == {5: "Иван Петров"}
+    # ID 0 не запрашивается вовсе, 7 запрашивается один раз
+    assert client.calls == [{"u7": "user.get?ID=7"}]
+
+    directory.resolve([0, 7])
+    UserDirectory(path, client=client).resolve([7])
+    assert len(client.calls) == 1